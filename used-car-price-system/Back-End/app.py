@@ -6,7 +6,20 @@ import json
 import os
 from config import app_config
 import visualization
-from joblib import load
+from model_manager import ModelHolder, parse_vehicle, build_feature_matrix, interval_confidence, FEATURE_ORDER
+from micro_batcher import MicroBatcher
+from inference_pool import InferencePool
+from lru_cache import LRUCache, MISSING
+from data_version import DataVersion
+from feature_encoder import FeatureEncoder
+from car_query import (parse_car_filters, filters_to_sql, filter_signature, parse_sort, order_by_sql,
+                       keyset_condition, encode_cursor, decode_cursor, FACET_COLUMNS, RANGE_FACET_COLUMNS,
+                       facet_values, range_buckets, parse_car_ids)
+from car_search_engine import CarSearchEngine
+from text_index import DescriptionIndex, query_terms
+from price_stats import ModelPriceStats
+from comps_index import ComparableSearch, NUMERIC_FEATURES, CATEGORICAL_FEATURES
+from trigram_index import MakeModelVocabulary
 import numpy as np
 
 
@@ -38,12 +51,312 @@ db_config = {
 def get_db_connection():
     return mysql.connector.connect(**db_config)
 
+# car_info 数据版本，内存中的字典、索引和缓存据此判断是否需要刷新
+car_data_version = DataVersion(get_db_connection, app_config.DATA_VERSION_CHECK_INTERVAL)
+
+# 分类名称到编码值的内存字典，预测接口可直接接收原始名称
+feature_encoder = FeatureEncoder(get_db_connection, car_data_version)
+
+# 车辆列表的总数缓存，键为规范化的筛选条件，数据版本变化时自动清空
+car_count_cache = LRUCache(app_config.CAR_COUNT_CACHE_SIZE, app_config.CAR_COUNT_CACHE_TTL)
+
+def count_cars(cursor, conditions, params, key=None):
+    """统计满足筛选条件的车辆数，结果按筛选条件（或指定的key）缓存"""
+    car_count_cache.bind_version(car_data_version.get())
+    if key is None:
+        key = filter_signature(conditions, params)
+    total = car_count_cache.get(key)
+    if total is MISSING:
+        count_query = "SELECT COUNT(*) as total FROM car_info"
+        if conditions:
+            count_query += " WHERE " + " AND ".join(conditions)
+        cursor.execute(count_query, params)
+        total = cursor.fetchone().get('total', 0)
+        car_count_cache.set(key, total)
+    return total
+
+# 车辆描述的倒排索引，供 q= 全文检索使用，首次检索时构建，新增数据后增量更新
+description_index = DescriptionIndex(get_db_connection, car_data_version)
+
+def add_text_ids(cursor, conditions, params, text_ids):
+    """
+    把全文检索得到的id列表追加为筛选条件
+    id不超过 TEXT_SEARCH_MAX_IN_IDS 个时直接追加为 id IN (...)；更多时写入当前连接的临时表，条件改为子查询，
+    同一连接上的总数和分页查询共用这份id，不再把整个列表拼进每条 SQL。临时表在连接关闭时自动删除
+    """
+    if not len(text_ids):
+        conditions.append("1 = 0")
+    elif len(text_ids) <= app_config.TEXT_SEARCH_MAX_IN_IDS:
+        conditions.append(f"id IN ({', '.join(['%s'] * len(text_ids))})")
+        params.extend(int(car_id) for car_id in text_ids)
+    else:
+        cursor.execute("CREATE TEMPORARY TABLE text_match_ids (id INT PRIMARY KEY)")
+        cursor.executemany("INSERT INTO text_match_ids (id) VALUES (%s)", [(int(car_id),) for car_id in text_ids])
+        conditions.append("id IN (SELECT id FROM text_match_ids)")
+
+# 车辆分面统计缓存，键与总数缓存相同，数据版本变化时自动清空
+car_facet_cache = LRUCache(app_config.CAR_FACET_CACHE_SIZE, app_config.CAR_COUNT_CACHE_TTL)
+
+# 分面统计中数值字段的分桶宽度
+FACET_BUCKET_WIDTHS = {
+    'Year': app_config.CAR_FACET_YEAR_BUCKET,
+    'Price': app_config.CAR_FACET_PRICE_BUCKET,
+    'Mileage': app_config.CAR_FACET_MILEAGE_BUCKET
+}
+
+def query_facets(cursor, conditions, params):
+    """
+    每个分面字段和每个数值分桶各用一条只按该字段分组的 GROUP BY 统计，
+    返回的行数为各字段取值（桶）数之和，不随字段之间的组合增长
+    返回:
+        (total, facets, ranges)
+    """
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+
+    def group_counts(expression, expression_params=()):
+        cursor.execute(
+            f"SELECT {expression} AS facet_value, COUNT(*) AS total FROM car_info{where} GROUP BY facet_value",
+            list(expression_params) + list(params)
+        )
+        return {row['facet_value']: row['total'] for row in cursor.fetchall()}
+
+    value_counts = {column: group_counts(f"`{column}`") for column in FACET_COLUMNS}
+    # 用整数除法 DIV 分桶：/ 的结果是只保留4位小数的 DECIMAL，19999 / 20000 会舍入为 1.0000，FLOOR 后落入下一个桶
+    bucket_counts = {
+        column: group_counts(f"`{column}` DIV %s", [FACET_BUCKET_WIDTHS[column]])
+        for column in RANGE_FACET_COLUMNS
+    }
+    # 每个字段的分组（包括 NULL）都覆盖全部满足条件的行
+    total = sum(value_counts[FACET_COLUMNS[0]].values())
+
+    facets = {column: facet_values(value_counts[column]) for column in FACET_COLUMNS}
+    ranges = {column: range_buckets({int(bucket): count for bucket, count in bucket_counts[column].items()
+                                     if bucket is not None}, FACET_BUCKET_WIDTHS[column])
+              for column in RANGE_FACET_COLUMNS}
+    return total, facets, ranges
+
+# 车辆详情行缓存，详情接口和批量查询共用，数据版本变化（新增、修改、删除）时自动清空
+car_row_cache = LRUCache(app_config.CAR_ROW_CACHE_SIZE, app_config.CAR_ROW_CACHE_TTL)
+
+def get_cars_by_ids(ids):
+    """
+    按id批量获取车辆，缓存未命中的id合并为一条 WHERE id IN (...) 查询
+    返回:
+        {id: 车辆}，不存在的id不在结果中
+    """
+    car_row_cache.bind_version(car_data_version.get())
+    cars = {}
+    missing = []
+    for car_id in ids:
+        car = car_row_cache.get(car_id)
+        if car is MISSING:
+            missing.append(car_id)
+        elif car is not None:
+            cars[car_id] = car
+    
+    if missing:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(f"""
+                SELECT 
+                    id, Make, Model, Year, Price, Mileage, Body_Type, 
+                    Cylinders, Transmission, Fuel_Type, Color, Location, 
+                    Date, Description 
+                FROM car_info
+                WHERE id IN ({', '.join(['%s'] * len(missing))})
+            """, missing)
+            found = {car['id']: car for car in cursor.fetchall()}
+        finally:
+            cursor.close()
+            conn.close()
+        for car_id in missing:
+            # 不存在的id也缓存为None，重复请求不再查询数据库
+            car = found.get(car_id)
+            car_row_cache.set(car_id, car)
+            if car is not None:
+                cars[car_id] = car
+    return cars
+
+def multi_get_response(raw_ids):
+    """批量查询车辆，按请求顺序返回存在的车辆，并列出不存在的id"""
+    try:
+        ids = parse_car_ids(raw_ids, app_config.CAR_MULTI_GET_MAX_IDS)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    
+    cars = get_cars_by_ids(ids)
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'cars': [cars[car_id] for car_id in ids if car_id in cars],
+            'missing': [car_id for car_id in ids if car_id not in cars]
+        }
+    }), 200
+
+# 按 (Make, Model, Year) 预先汇总的价格统计，供同型号查询使用，新增数据后增量更新
+model_price_stats = ModelPriceStats(get_db_connection, car_data_version)
+
+# 不同品牌、型号取值的三元组索引，把拼写有误的品牌、型号解析为库中的规范写法
+make_model_vocabulary = MakeModelVocabulary(model_price_stats)
+
+# 按 (Make, Model) 分区的 KD 树，供可比车辆检索使用，启动时构建，新增数据后只重建受影响的分区
+comps_search = ComparableSearch(get_db_connection, car_data_version)
+try:
+    comps_search.index()
+except Exception as e:
+    print(f"启动时构建可比车辆索引失败，将在首次查询时重试: {str(e)}")
+
+# 内存列式搜索引擎，CAR_SEARCH_ENGINE=memory 时启用，首次查询时加载
+car_search_engine = CarSearchEngine(get_db_connection, car_data_version) \
+    if app_config.CAR_SEARCH_ENGINE == 'memory' else None
+
+def vehicle_row(data):
+    """把车辆数据（原始分类名称或已编码值）转换为按模型顺序排列的特征行"""
+    return parse_vehicle(feature_encoder.encode(data))
+
+# 预测模型在进程启动时加载一次，模型文件变化后自动切换
+model_holder = ModelHolder(app_config.SERVING_MODEL_PATH, app_config.MODEL_CHECK_INTERVAL, app_config.PREDICT_ENGINE)
+try:
+    model_holder.load()
+except Exception as e:
+    print(f"启动时加载预测模型失败，将在首次预测时重试: {str(e)}")
+
+# 大批量预测交给工作进程并行执行，未启用时为None
+inference_pool = InferencePool(
+    workers=app_config.PREDICT_POOL_WORKERS,
+    min_rows=app_config.PREDICT_POOL_MIN_ROWS
+) if app_config.PREDICT_POOL_ENABLED else None
+
+def estimate_prices(snapshot, features):
+    """按配置预测价格及区间，返回 (price, low, high) 元组列表"""
+    coverage = app_config.PREDICT_INTERVAL_COVERAGE if app_config.PREDICT_INTERVAL_ENABLED else None
+    if inference_pool is not None:
+        return inference_pool.estimate(snapshot, features, coverage, app_config.PREDICT_INTERVAL_MAX_TREES)
+    return snapshot.estimate(features, coverage, app_config.PREDICT_INTERVAL_MAX_TREES)
+
+# 并发的单条预测请求合并成批，只合并使用同一模型快照的请求，价格与缓存、特征贡献来自同一版本
+micro_batcher = MicroBatcher(
+    estimate_prices,
+    window_ms=app_config.PREDICT_MICROBATCH_WINDOW_MS,
+    max_batch=app_config.PREDICT_MICROBATCH_MAX_SIZE
+)
+
+# 预测结果缓存，键为按模型顺序排列的10个特征，模型版本变化时自动清空
+prediction_cache = LRUCache(app_config.PREDICT_CACHE_MAX_SIZE, app_config.PREDICT_CACHE_TTL)
+
+def use_prediction_cache(data):
+    """判断本次请求是否使用预测缓存，可通过 ?cache=false 或请求体 use_cache=false 关闭"""
+    if not app_config.PREDICT_CACHE_ENABLED:
+        return False
+    if request.args.get('cache', '').lower() in ('false', '0'):
+        return False
+    if isinstance(data, dict) and data.get('use_cache') is False:
+        return False
+    return True
+
+# 折旧曲线缓存，键为车辆特征与网格定义，模型版本变化时自动清空
+curve_cache = LRUCache(app_config.PREDICT_CURVE_CACHE_SIZE, app_config.PREDICT_CACHE_TTL)
+
+def parse_grid(spec, name):
+    """
+    解析网格定义，支持 {"start": 0, "stop": 200000, "step": 10000}（包含stop）或取值数组
+    返回:
+        整数取值列表，定义不合法时抛出ValueError
+    """
+    if isinstance(spec, list):
+        try:
+            values = [int(value) for value in spec]
+        except (ValueError, TypeError):
+            raise ValueError(f'{name} 的取值必须是数字')
+    elif isinstance(spec, dict):
+        try:
+            start, stop, step = int(spec['start']), int(spec['stop']), int(spec.get('step', 1))
+        except (KeyError, ValueError, TypeError):
+            raise ValueError(f'{name} 网格需要数字类型的 start、stop 和 step')
+        if step <= 0 or stop < start:
+            raise ValueError(f'{name} 网格的 step 必须大于0且 stop 不小于 start')
+        if (stop - start) // step + 1 > app_config.PREDICT_CURVE_MAX_POINTS:
+            raise ValueError(f'网格点数不能超过 {app_config.PREDICT_CURVE_MAX_POINTS}')
+        values = list(range(start, stop + 1, step))
+    else:
+        raise ValueError(f'{name} 网格必须是对象或数组')
+    
+    if not values:
+        raise ValueError(f'{name} 网格不能为空')
+    return values
+
+def explain_requested(data, default):
+    """判断本次请求是否计算逐条预测的特征贡献，可通过请求体 explain 字段控制"""
+    if not app_config.PREDICT_EXPLAIN_ENABLED:
+        return False
+    if isinstance(data, dict) and 'explain' in data:
+        return bool(data.get('explain'))
+    return default
+
+def predict_rows(snapshot, rows, use_cache=True):
+    """
+    预测多行特征，命中缓存的行不再进入模型，其余行合并为一次模型调用
+    返回:
+        与rows顺序一致的 (price, low, high) 元组列表
+    """
+    estimates = [None] * len(rows)
+    pending = []
+    if use_cache:
+        prediction_cache.bind_version(snapshot.version)
+        for index, row in enumerate(rows):
+            estimate = prediction_cache.get(tuple(row))
+            if estimate is MISSING:
+                pending.append(index)
+            else:
+                estimates[index] = estimate
+    else:
+        pending = list(range(len(rows)))
+    
+    if pending:
+        # 只剩一行时交给微批调度器，与其他并发请求合并执行
+        if len(pending) == 1 and app_config.PREDICT_MICROBATCH_ENABLED:
+            values = [micro_batcher.submit(rows[pending[0]], snapshot)]
+        else:
+            values = estimate_prices(snapshot, build_feature_matrix([rows[index] for index in pending]))
+        for index, value in zip(pending, values):
+            estimates[index] = value
+            if use_cache:
+                prediction_cache.set(tuple(rows[index]), value)
+    return estimates
+
+def explain_rows(snapshot, rows, use_cache=True):
+    """
+    计算多行的特征贡献，价格及区间在同一次遍历中得到，不再单独预测
+    返回:
+        (estimates, baseline, factors_list)，estimates 与 predict_rows 的返回值相同
+    """
+    coverage = app_config.PREDICT_INTERVAL_COVERAGE if app_config.PREDICT_INTERVAL_ENABLED else None
+    baseline, factors_list, estimates = snapshot.explain(
+        build_feature_matrix(rows), coverage, app_config.PREDICT_INTERVAL_MAX_TREES
+    )
+    if use_cache:
+        prediction_cache.bind_version(snapshot.version)
+        for row, estimate in zip(rows, estimates):
+            prediction_cache.set(tuple(row), estimate)
+    return estimates, baseline, factors_list
+
 @app.route('/api/v1/cars', methods=['GET'])
 def get_cars():
     """
     获取车辆列表API，支持分页和多条件筛选
     参数:
+        ids: 逗号分隔的车辆id（如 ids=1,2,3），传入后按id批量获取，忽略其他参数
         page: 页码，默认1
+        cursor: 上一页返回的 next_cursor，传入后按游标分页并忽略page
+        q: 在车辆描述中全文检索，多个词需同时出现（如 q=sunroof rear camera）
+        sort: 排序字段，id（默认）、price、mileage、year 或 date
+        order: 排序方向，desc（默认）或 asc
+        match: 文本字段的匹配方式，contains（默认，包含）、exact（精确）或 prefix（前缀），后两者可以使用索引
+        include_total: 是否统计总数，默认true；为false时不执行COUNT，total和total_pages返回null
         limit: 每页数量，默认10
         make: 品牌
         model: 型号
@@ -61,13 +374,22 @@ def get_cars():
     返回:
         cars: 车辆列表
         total: 总数
-        page: 当前页码
+        page: 当前页码（游标分页时为null）
         total_pages: 总页数
+        has_more: 是否还有下一页
+        next_cursor: 下一页的游标，没有更多数据时为null
+        resolved: 按相似度替换过的品牌、型号，如 {"make": "mercedes-benz"}
     """
     try:
+        # 按id批量获取，返回 cars（按请求顺序）和 missing（不存在的id）
+        if 'ids' in request.args:
+            return multi_get_response(request.args.get('ids', ''))
+        
         # 获取查询参数
         page = int(request.args.get('page', 1))
         limit = int(request.args.get('limit', app_config.DEFAULT_PAGE_SIZE))
+        cursor_token = request.args.get('cursor')
+        include_total = request.args.get('include_total', 'true').lower() not in ('false', '0')
         
         # 确保页码和每页数量有效
         if page < 1:
@@ -77,111 +399,298 @@ def get_cars():
             
         offset = (page - 1) * limit
         
-        # 构建查询条件
-        conditions = []
-        params = []
-        
-        # 过滤参数
-        if request.args.get('make'):
-            conditions.append("Make LIKE %s")
-            params.append(f"%{request.args.get('make')}%")
-            
-        if request.args.get('model'):
-            conditions.append("Model LIKE %s")
-            params.append(f"%{request.args.get('model')}%")
+        # 构建查询条件，品牌、型号在库中找不到任何匹配时先解析为最相近的规范写法
+        try:
+            filter_args, resolved = make_model_vocabulary.resolve_filters(
+                request.args, app_config.FUZZY_MATCH_THRESHOLD
+            )
+            filters = parse_car_filters(filter_args)
+            sort_column, order = parse_sort(request.args)
+            after = decode_cursor(cursor_token, sort_column, order) if cursor_token else None
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
         
-        if request.args.get('year_min'):
-            conditions.append("Year >= %s")
-            params.append(int(request.args.get('year_min')))
-            
-        if request.args.get('year_max'):
-            conditions.append("Year <= %s")
-            params.append(int(request.args.get('year_max')))
-            
-        if request.args.get('price_min'):
-            conditions.append("Price >= %s")
-            params.append(int(request.args.get('price_min')))
+        if after is not None:
+            page = None
+            offset = 0
+        
+        # 全文检索：先在倒排索引上求出描述匹配的id，再与结构化筛选条件组合
+        terms = query_terms(request.args.get('q', ''))
+        text_ids = description_index.search(terms) if terms is not None else None
+        
+        if car_search_engine is not None:
+            # 内存引擎：向量化筛选后直接分页（非默认排序时做 top-k 选择），总数随筛选一并得到
+            cars, total, has_more = car_search_engine.search(
+                filters, offset, limit, after, sort_column, order, text_ids
+            )
+            if not include_total:
+                total = None
+        else:
+            # 连接数据库
+            conn = get_db_connection()
+            cursor = conn.cursor(dictionary=True)
             
-        if request.args.get('price_max'):
-            conditions.append("Price <= %s")
-            params.append(int(request.args.get('price_max')))
+            conditions, params = filters_to_sql(filters)
+            count_key = None
+            if text_ids is not None:
+                # 总数缓存以检索词而不是id列表作为键
+                count_key = filter_signature(conditions, params) + (('q',) + terms,)
+                add_text_ids(cursor, conditions, params, text_ids)
             
-        if request.args.get('mileage_min'):
-            conditions.append("Mileage >= %s")
-            params.append(int(request.args.get('mileage_min')))
+            # 游标分页：从上一页最后一行之后继续，走 (排序列, id) 索引的范围扫描
+            page_conditions = list(conditions)
+            page_params = list(params)
+            if after is not None:
+                condition, condition_params = keyset_condition(sort_column, order, *after)
+                page_conditions.append(condition)
+                page_params.extend(condition_params)
             
-        if request.args.get('mileage_max'):
-            conditions.append("Mileage <= %s")
-            params.append(int(request.args.get('mileage_max')))
+            # 构建基础查询
+            base_query = """
+                SELECT 
+                    id, Make, Model, Year, Price, Mileage, Body_Type, 
+                    Cylinders, Transmission, Fuel_Type, Color, Location, 
+                    Date, Description 
+                FROM car_info
+            """
             
-        if request.args.get('body_type'):
-            conditions.append("Body_Type LIKE %s")
-            params.append(f"%{request.args.get('body_type')}%")
+            # 添加条件
+            if page_conditions:
+                base_query += " WHERE " + " AND ".join(page_conditions)
             
-        if request.args.get('fuel_type'):
-            conditions.append("Fuel_Type LIKE %s")
-            params.append(f"%{request.args.get('fuel_type')}%")
+            # 计算总数（include_total=false 时跳过）
+            total = count_cars(cursor, conditions, params, count_key) if include_total else None
             
-        if request.args.get('transmission'):
-            conditions.append("Transmission LIKE %s")
-            params.append(f"%{request.args.get('transmission')}%")
+            # 添加排序和分页，多取一行用于判断是否还有下一页
+            base_query += f" {order_by_sql(sort_column, order)} LIMIT %s OFFSET %s"
+            page_params.extend([limit + 1, offset])
             
-        if request.args.get('color'):
-            conditions.append("Color LIKE %s")
-            params.append(f"%{request.args.get('color')}%")
+            # 执行查询
+            cursor.execute(base_query, page_params)
+            cars = cursor.fetchall()
+            has_more = len(cars) > limit
+            cars = cars[:limit]
             
-        if request.args.get('location'):
-            conditions.append("Location LIKE %s")
-            params.append(f"%{request.args.get('location')}%")
+            # 关闭连接
+            cursor.close()
+            conn.close()
         
-        # 连接数据库
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        # 计算总页数
+        total_pages = (total + limit - 1) // limit if include_total else None
         
-        # 构建基础查询
-        base_query = """
-            SELECT 
-                id, Make, Model, Year, Price, Mileage, Body_Type, 
-                Cylinders, Transmission, Fuel_Type, Color, Location, 
-                Date, Description 
-            FROM car_info
-        """
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'cars': cars,
+                'total': total,
+                'page': page,
+                'total_pages': total_pages,
+                'limit': limit,
+                'has_more': has_more,
+                'next_cursor': encode_cursor(cars[-1], sort_column, order) if has_more else None,
+                'resolved': resolved
+            }
+        }), 200
         
-        # 添加条件
-        if conditions:
-            base_query += " WHERE " + " AND ".join(conditions)
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/v1/cars/facets', methods=['GET'])
+def get_car_facets():
+    """
+    获取车辆分面统计API，筛选参数与 /api/v1/cars 相同
+    参数:
+        q、match、make、model、year_min ... location: 同车辆列表接口
+    返回:
+        total: 满足筛选条件的车辆数
+        facets: 各文本字段（Make、Body_Type、Fuel_Type、Transmission、Color、Location）的取值及数量
+        ranges: 年份、价格、里程按固定宽度分桶的数量，min 和 max 均包含在区间内
+        resolved: 按相似度替换过的品牌、型号
+    """
+    try:
+        try:
+            filter_args, resolved = make_model_vocabulary.resolve_filters(
+                request.args, app_config.FUZZY_MATCH_THRESHOLD
+            )
+            filters = parse_car_filters(filter_args)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
         
-        # 计算总数
-        count_query = f"SELECT COUNT(*) as total FROM car_info"
-        if conditions:
-            count_query += " WHERE " + " AND ".join(conditions)
-            
-        cursor.execute(count_query, params)
-        total = cursor.fetchone().get('total', 0)
+        terms = query_terms(request.args.get('q', ''))
+        conditions, params = filters_to_sql(filters)
+        key = filter_signature(conditions, params) + ((('q',) + terms,) if terms is not None else ())
+        
+        car_facet_cache.bind_version(car_data_version.get())
+        result = car_facet_cache.get(key)
+        if result is MISSING:
+            text_ids = description_index.search(terms) if terms is not None else None
+            if car_search_engine is not None:
+                # 内存引擎：一次筛选后对各列编码和分桶序号做 bincount
+                total, facets, ranges = car_search_engine.facets(filters, FACET_BUCKET_WIDTHS, text_ids)
+            else:
+                conn = get_db_connection()
+                cursor = conn.cursor(dictionary=True)
+                try:
+                    if text_ids is not None:
+                        add_text_ids(cursor, conditions, params, text_ids)
+                    total, facets, ranges = query_facets(cursor, conditions, params)
+                finally:
+                    cursor.close()
+                    conn.close()
+            result = {
+                'total': total,
+                'facets': facets,
+                'ranges': ranges
+            }
+            car_facet_cache.set(key, result)
         
-        # 添加排序和分页
-        base_query += " ORDER BY id DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
+        return jsonify({
+            'status': 'success',
+            'data': dict(result, resolved=resolved)
+        }), 200
         
-        # 执行查询
-        cursor.execute(base_query, params)
-        cars = cursor.fetchall()
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/v1/cars/batch', methods=['POST'])
+def get_cars_batch():
+    """
+    批量获取车辆详情
+    请求体:
+        id数组，或 {"ids": [1, 2, 3]}
+    返回:
+        cars: 按请求顺序排列的车辆
+        missing: 不存在的车辆id
+    """
+    try:
+        data = request.get_json(silent=True)
+        ids = data.get('ids') if isinstance(data, dict) else data
+        return multi_get_response(ids)
         
-        # 关闭连接
-        cursor.close()
-        conn.close()
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/v1/cars/suggest', methods=['GET'])
+def suggest_make_model():
+    """
+    品牌、型号输入提示API
+    参数:
+        field: make 或 model
+        q: 用户输入
+        make: field=model 时可选，只提示该品牌（包含匹配）的型号
+        limit: 返回数量，默认10
+    返回:
+        suggestions: [{value, similarity}]，包含输入内容的取值在前，其余按三元组相似度从高到低排列
+    """
+    try:
+        field = request.args.get('field', 'make').lower()
+        if field not in ('make', 'model'):
+            return jsonify({
+                'status': 'error',
+                'message': 'field 只能是 make 或 model'
+            }), 400
+        limit = int(request.args.get('limit', app_config.FUZZY_SUGGEST_LIMIT))
+        if limit < 1 or limit > app_config.MAX_PAGE_SIZE:
+            limit = app_config.FUZZY_SUGGEST_LIMIT
         
-        # 计算总页数
-        total_pages = (total + limit - 1) // limit
+        vocabulary = make_model_vocabulary.get()
+        scope = None
+        if field == 'model' and request.args.get('make'):
+            scope = vocabulary.models_of(request.args.get('make'))
+        suggestions = vocabulary.suggest(
+            field, request.args.get('q', ''), app_config.FUZZY_MATCH_THRESHOLD, limit, scope
+        )
         
         return jsonify({
             'status': 'success',
             'data': {
-                'cars': cars,
-                'total': total,
-                'page': page,
-                'total_pages': total_pages,
-                'limit': limit
+                'suggestions': [{'value': value, 'similarity': similarity} for value, similarity in suggestions]
+            }
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/v1/cars/comps', methods=['GET'])
+def get_comparable_cars():
+    """
+    获取可比车辆API，在同品牌同型号的车辆中查找年份、里程、气缸数和各分类字段最接近的 k 辆车
+    参数:
+        car_id: 以已有车辆为查询对象（结果中排除其本身），传入后忽略下列车辆字段
+        make、model、year、mileage: 查询车辆的品牌、型号、年份和里程（未传 car_id 时必填）
+        cylinders、body_type、transmission、fuel_type、color、location: 可选，未指定的分类字段不参与比较
+        k: 返回数量，默认10
+    返回:
+        comps: 按距离从近到远排列的车辆，distance 为缩放后特征空间中的欧氏距离
+        avg_price、median_price: 这些车辆的平均价格和中位价格
+        partition_size: 同品牌同型号的车辆数
+    """
+    try:
+        k = int(request.args.get('k', app_config.COMPS_DEFAULT_K))
+        if k < 1 or k > app_config.COMPS_MAX_K:
+            k = app_config.COMPS_DEFAULT_K
+        
+        car_id = request.args.get('car_id', type=int)
+        if car_id is not None:
+            vehicle = get_cars_by_ids([car_id]).get(car_id)
+            if vehicle is None:
+                return jsonify({
+                    'status': 'error',
+                    'message': '车辆不存在'
+                }), 404
+        else:
+            vehicle = {'Make': request.args.get('make'), 'Model': request.args.get('model')}
+            try:
+                for column in NUMERIC_FEATURES:
+                    value = request.args.get(column.lower())
+                    vehicle[column] = float(value) if value not in (None, '') else None
+            except ValueError:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'year、mileage、cylinders 必须是数字'
+                }), 400
+            for column in CATEGORICAL_FEATURES:
+                vehicle[column] = request.args.get(column.lower()) or None
+            if not vehicle['Make'] or not vehicle['Model'] or vehicle['Year'] is None or vehicle['Mileage'] is None:
+                return jsonify({
+                    'status': 'error',
+                    'message': '缺少必要参数: make、model、year和mileage'
+                }), 400
+        
+        partition, neighbours = comps_search.query(vehicle, k, car_id)
+        
+        # 车辆详情从行缓存中批量获取
+        cars = get_cars_by_ids([neighbour_id for neighbour_id, _, _ in neighbours])
+        comps = [dict(cars[neighbour_id], distance=distance)
+                 for neighbour_id, distance, _ in neighbours if neighbour_id in cars]
+        prices = [price for _, _, price in neighbours if price is not None]
+        
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'comps': comps,
+                'avg_price': sum(prices) / len(prices) if prices else None,
+                'median_price': float(np.median(prices)) if prices else None,
+                'partition_size': partition.size if partition is not None else 0,
+                'k': k
             }
         }), 200
         
@@ -201,26 +710,8 @@ def get_car_detail(car_id):
         car: 车辆详情
     """
     try:
-        # 连接数据库
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # 查询车辆详情
-        query = """
-            SELECT 
-                id, Make, Model, Year, Price, Mileage, Body_Type, 
-                Cylinders, Transmission, Fuel_Type, Color, Location, 
-                Date, Description 
-            FROM car_info
-            WHERE id = %s
-        """
-        
-        cursor.execute(query, (car_id,))
-        car = cursor.fetchone()
-        
-        # 关闭连接
-        cursor.close()
-        conn.close()
+        # 先查行缓存，未命中时按主键查询
+        car = get_cars_by_ids([car_id]).get(car_id)
         
         if car:
             return jsonify({
@@ -241,6 +732,68 @@ def get_car_detail(car_id):
             'message': str(e)
         }), 500
 
+@app.route('/api/v1/cars/stats', methods=['GET'])
+def get_car_index_stats():
+    """
+    获取车辆查询相关的内存数据和缓存的运行统计
+    返回:
+        data_version: 当前的 car_info 数据版本
+        search_engine: 内存搜索引擎的快照信息（行数、构建耗时、内存占用），SQL 模式下 enabled 为false
+        description_index: 描述全文检索倒排索引的行数、词数及重建、增量更新次数
+        price_stats: 同型号价格统计的型号数、行数及重建、增量更新次数
+        comps: 可比车辆 KD 树索引的行数、分区数、构建耗时及重建、增量更新次数
+        caches: 总数、分面和车辆行缓存的命中统计
+    """
+    try:
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'data_version': list(car_data_version.get()),
+                'search_engine': car_search_engine.stats() if car_search_engine is not None else {'enabled': False},
+                'description_index': description_index.stats(),
+                'price_stats': model_price_stats.stats(),
+                'comps': comps_search.stats(),
+                'caches': {
+                    'count': car_count_cache.stats(),
+                    'facets': car_facet_cache.stats(),
+                    'rows': car_row_cache.stats()
+                }
+            }
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/v1/cars/refresh', methods=['POST'])
+def refresh_car_data():
+    """
+    立即产生新的 car_info 数据版本，不等待 DATA_VERSION_CHECK_INTERVAL，探测不到的外部修改
+    （行数、最大ID不变且 UPDATE_TIME 不可用）也会生效：各索引按新版本重新核对数据，缓存随之清空；
+    启用内存搜索引擎时同步重新加载快照，加载期间的请求继续使用旧快照
+    返回:
+        data_version: 刷新后的数据版本
+        search_engine: 刷新后内存搜索引擎的快照信息
+    """
+    try:
+        car_data_version.bump()
+        version = car_data_version.get(force=True)
+        if car_search_engine is not None:
+            car_search_engine.refresh(force=True)
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'data_version': list(version),
+                'search_engine': car_search_engine.stats() if car_search_engine is not None else {'enabled': False}
+            }
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
 # 可视化API路由
 @app.route('/api/v1/visualization/charts', methods=['GET'])
 def get_all_visualization_types():
@@ -389,100 +942,246 @@ def predict_price():
                 'message': '请求中缺少车辆数据'
             }), 400
         
-        # 从请求中获取已编码的特征
-        required_features = ['Make_encoded', 'Model_encoded', 'Year', 'Mileage', 
-                          'Body_Type_encoded', 'Transmission_encoded', 
-                          'Fuel_Type_encoded', 'Color_encoded']
+        # 校验并按训练时的顺序提取已编码特征，原始分类名称（Make、Model等）由服务端编码
+        # 训练时顺序: Make_encoded, Year, Mileage, Cylinders, Body Type_encoded, Transmission_encoded, 
+        # Fuel Type_encoded, Color_encoded, Location_encoded, Model_encoded
+        try:
+            row = vehicle_row(data)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        
+        # 获取当前模型版本，整个请求内使用同一版本
+        snapshot = model_holder.get()
         
-        # 检查是否所有必要特征都在请求中
-        missing_features = []
-        for feature in required_features:
-            if feature not in data:
-                missing_features.append(feature)
+        # 预测价格及区间，区间取各棵树预测值的分位数，未开启时按预测价格的±10%估算
+        # 影响因素：默认按决策路径计算本车各特征的贡献，价格和区间在同一次遍历中得到；
+        # 关闭时返回模型加载时计算好的全局特征重要性（模型没有可用的特征重要性时仍按决策路径计算），
+        # 价格优先读取缓存，开启微批时与其他并发请求合并执行
+        explain = explain_requested(data, True) or snapshot.factors is None
+        if explain:
+            estimates, baseline, factors_list = explain_rows(snapshot, [row], use_prediction_cache(data))
+        else:
+            estimates = predict_rows(snapshot, [row], use_prediction_cache(data))
+        predicted_price, lower_bound, upper_bound = estimates[0]
+        
+        result = {
+            'price': predicted_price,
+            'priceRange': {
+                'low': lower_bound,
+                'high': upper_bound
+            },
+            'confidence': interval_confidence(predicted_price, lower_bound, upper_bound)
+        }
+        
+        if explain:
+            result['baseline'] = baseline
+            result['factors'] = factors_list[0]
+        else:
+            result['factors'] = snapshot.factors
         
-        if missing_features:
+        return jsonify({
+            'status': 'success',
+            'data': result
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/v1/prediction/predict/batch', methods=['POST'])
+def predict_price_batch():
+    """
+    批量预测价格，整批只调用一次模型
+    请求体:
+        车辆数组，或 {"vehicles": [...], "use_cache": true, "explain": false}，每辆车的字段与单条预测相同
+    返回:
+        results: 与请求顺序一致的逐行结果，校验失败的行返回error而不影响其他行
+    """
+    try:
+        data = request.json
+        vehicles = data.get('vehicles') if isinstance(data, dict) else data
+        if not isinstance(vehicles, list) or not vehicles:
             return jsonify({
                 'status': 'error',
-                'message': f'缺少必要特征: {", ".join(missing_features)}'
+                'message': '请求中缺少车辆数组'
             }), 400
-            
-        # 处理可选的Location_encoded参数
-        if 'Location_encoded' not in data:
-            data['Location_encoded'] = 0  # 设置默认值
-            
-        # 处理缺失的Cylinders字段
-        if 'Cylinders' not in data:
-            data['Cylinders'] = 4  # 设置默认值
         
-        # 确保所有编码值都是数字类型
-        for key, value in data.items():
-            if key.endswith('_encoded') or key in ['Year', 'Mileage', 'Cylinders']:
-                try:
-                    data[key] = int(value)
-                except (ValueError, TypeError):
-                    return jsonify({
-                        'status': 'error',
-                        'message': f'特征 {key} 的值必须是数字'
-                    }), 400
-
-        # 加载预训练模型 - 使用绝对路径
-        import os
-        model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'random_forest_model.joblib')
-        model = load(model_path)
-        
-        # 构建模型输入特征数组，确保顺序与训练时一致
-        # 训练时顺序: Make_encoded, Year, Mileage, Cylinders, Body Type_encoded, Transmission_encoded, 
-        # Fuel Type_encoded, Color_encoded, Location_encoded, Model_encoded
-        features = np.array([
-            data['Make_encoded'],
-            data['Year'],
-            data['Mileage'],
-            data['Cylinders'],
-            data['Body_Type_encoded'],
-            data['Transmission_encoded'],
-            data['Fuel_Type_encoded'],
-            data['Color_encoded'],
-            data['Location_encoded'],
-            data['Model_encoded']
-        ]).reshape(1, -1)
-        
-        # 预测价格
-        predicted_price = float(model.predict(features)[0])
-        
-        # 计算预测区间 (假设为预测价格的±10%)
-        lower_bound = predicted_price * 0.9
-        upper_bound = predicted_price * 1.1
-        
-        # 从输入特征中提取影响因素
-        feature_importances = model.feature_importances_
-        feature_names = ['Make', 'Year', 'Mileage', 'Cylinders', 'Body Type', 
-                       'Transmission', 'Fuel Type', 'Color', 'Location', 'Model']
-        
-        # 将特征重要性转换为影响因素列表
-        factors = []
-        for i, (name, importance) in enumerate(zip(feature_names, feature_importances)):
-            # 计算影响百分比
-            impact_percent = importance * 100
-            impact_str = f"+{impact_percent:.1f}%" if importance > 0 else f"-{abs(impact_percent):.1f}%"
+        if len(vehicles) > app_config.PREDICT_BATCH_MAX_SIZE:
+            return jsonify({
+                'status': 'error',
+                'message': f'单次最多预测 {app_config.PREDICT_BATCH_MAX_SIZE} 辆车'
+            }), 400
+        
+        # 逐行校验，记录合法行在结果中的位置
+        results = [None] * len(vehicles)
+        rows = []
+        row_indexes = []
+        for index, vehicle in enumerate(vehicles):
+            try:
+                rows.append(vehicle_row(vehicle))
+                row_indexes.append(index)
+            except ValueError as e:
+                results[index] = {
+                    'index': index,
+                    'error': str(e)
+                }
+        
+        if rows:
+            snapshot = model_holder.get()
+            # 批量请求默认不返回影响因素，explain=true 时整批向量化计算，价格和区间在同一次遍历中得到
+            explain = explain_requested(data, False)
+            if explain:
+                estimates, baseline, factors_list = explain_rows(snapshot, rows, use_prediction_cache(data))
+            else:
+                estimates = predict_rows(snapshot, rows, use_prediction_cache(data))
+            for index, (price, low, high) in zip(row_indexes, estimates):
+                results[index] = {
+                    'index': index,
+                    'price': price,
+                    'priceRange': {
+                        'low': low,
+                        'high': high
+                    },
+                    'confidence': interval_confidence(price, low, high)
+                }
             
-            factors.append({
-                'name': name,
-                'impact': impact_str
-            })
+            if explain:
+                for index, factors in zip(row_indexes, factors_list):
+                    results[index]['baseline'] = baseline
+                    results[index]['factors'] = factors
+        
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'results': results,
+                'total': len(vehicles),
+                'succeeded': len(rows),
+                'failed': len(vehicles) - len(rows)
+            }
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/v1/prediction/curve', methods=['POST'])
+def predict_price_curve():
+    """
+    预测一辆车的价格随里程和/或年份变化的曲线
+    请求体:
+        单条预测所需的车辆特征，外加 mileage 和/或 year 网格定义，
+        例如 {"mileage": {"start": 0, "stop": 200000, "step": 10000}, "year": [2015, 2018, 2021]}
+    返回:
+        只给一个网格时返回一维曲线，同时给出两个网格时返回以年份为行、里程为列的二维价格矩阵
+    """
+    try:
+        data = request.json
+        if not isinstance(data, dict) or not data:
+            return jsonify({
+                'status': 'error',
+                'message': '请求中缺少车辆数据'
+            }), 400
+        
+        mileage_spec = data.pop('mileage', None)
+        year_spec = data.pop('year', None)
+        if mileage_spec is None and year_spec is None:
+            return jsonify({
+                'status': 'error',
+                'message': '至少需要提供 mileage 或 year 网格'
+            }), 400
+        
+        # 网格变量在校验时先用占位值，构建网格时再逐点替换
+        data.setdefault('Mileage', 0)
+        data.setdefault('Year', 0)
+        try:
+            row = vehicle_row(data)
+            mileages = parse_grid(mileage_spec, 'mileage') if mileage_spec is not None else [data['Mileage']]
+            years = parse_grid(year_spec, 'year') if year_spec is not None else [data['Year']]
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
         
-        # 按影响程度排序
-        factors.sort(key=lambda x: abs(float(x['impact'].replace('+', '').replace('-', '').replace('%', ''))), reverse=True)
+        if len(mileages) * len(years) > app_config.PREDICT_CURVE_MAX_POINTS:
+            return jsonify({
+                'status': 'error',
+                'message': f'网格点数不能超过 {app_config.PREDICT_CURVE_MAX_POINTS}'
+            }), 400
         
+        snapshot = model_holder.get()
+        # 被扫描的列由网格决定，请求里的占位值或原值不参与缓存键，否则同一条曲线会按原值重复缓存
+        key_row = list(row)
+        if mileage_spec is not None:
+            key_row[FEATURE_ORDER.index('Mileage')] = None
+        if year_spec is not None:
+            key_row[FEATURE_ORDER.index('Year')] = None
+        cache_key = (tuple(key_row), mileage_spec is not None, tuple(mileages), year_spec is not None, tuple(years))
+        curve_cache.bind_version(snapshot.version)
+        curve = curve_cache.get(cache_key)
+        if curve is MISSING:
+            # 在NumPy中构建完整网格：每个 (年份, 里程) 组合一行，整个网格只调用一次模型
+            year_grid, mileage_grid = np.meshgrid(years, mileages, indexing='ij')
+            features = np.tile(build_feature_matrix([row]), (year_grid.size, 1))
+            features[:, FEATURE_ORDER.index('Year')] = year_grid.ravel()
+            features[:, FEATURE_ORDER.index('Mileage')] = mileage_grid.ravel()
+            prices = snapshot.predict(features).reshape(len(years), len(mileages))
+            
+            if mileage_spec is not None and year_spec is not None:
+                curve = {
+                    'type': 'surface',
+                    'years': years,
+                    'mileages': mileages,
+                    'prices': prices.tolist()
+                }
+            elif mileage_spec is not None:
+                curve = {
+                    'type': 'curve',
+                    'axis': 'mileage',
+                    'mileages': mileages,
+                    'prices': prices[0].tolist()
+                }
+            else:
+                curve = {
+                    'type': 'curve',
+                    'axis': 'year',
+                    'years': years,
+                    'prices': prices[:, 0].tolist()
+                }
+            curve_cache.set(cache_key, curve)
+        
+        return jsonify({
+            'status': 'success',
+            'data': curve
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/v1/prediction/stats', methods=['GET'])
+def get_prediction_stats():
+    """获取预测服务的运行统计（模型版本、微批处理）"""
+    try:
+        snapshot = model_holder.get()
         return jsonify({
             'status': 'success',
             'data': {
-                'price': predicted_price,
-                'priceRange': {
-                    'low': lower_bound,
-                    'high': upper_bound
+                'model': {
+                    'path': snapshot.path,
+                    'version': snapshot.version,
+                    'engine': snapshot.engine,
+                    'loaded_at': snapshot.loaded_at
                 },
-                'confidence': 90,  # 假定置信度为90%
-                'factors': factors
+                'micro_batching': dict(micro_batcher.stats(), enabled=app_config.PREDICT_MICROBATCH_ENABLED),
+                'cache': dict(prediction_cache.stats(), enabled=app_config.PREDICT_CACHE_ENABLED),
+                'inference_pool': inference_pool.stats() if inference_pool is not None else {'enabled': False}
             }
         }), 200
     except Exception as e:
@@ -871,11 +1570,25 @@ def login():
 
 @app.route('/api/v1/cars/similar-models', methods=['GET'])
 def get_similar_models():
-    """获取同型号车辆的价格信息"""
+    """
+    获取同型号车辆的价格信息
+    参数:
+        make: 品牌
+        model: 型号
+        page: similar_cars 的页码，默认1
+        limit: similar_cars 每页数量，默认10
+    返回:
+        similar_cars: 当前页的同型号车辆，按年份从新到旧、价格从低到高排列
+        stats: 全部同型号车辆的均价、最低价、最高价、数量和分位数
+        price_by_year: 各年份的价格统计
+        match: exact（精确匹配）、fuzzy（包含匹配）或 similar（按相似度解析，resolved 为解析后的品牌、型号）
+    """
     try:
         # 获取查询参数
         make = request.args.get('make')
         model = request.args.get('model')
+        page = int(request.args.get('page', 1))
+        limit = int(request.args.get('limit', app_config.DEFAULT_PAGE_SIZE))
         
         print(f"查询同型号车辆: 品牌={make}, 型号={model}")
         
@@ -884,95 +1597,70 @@ def get_similar_models():
                 'status': 'error',
                 'message': '缺少必要参数: make和model'
             }), 400
-            
-        # 连接数据库
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # 查询同型号车辆
-        query = """
-            SELECT 
-                id, Make, Model, Year, Price, Mileage, Body_Type, Cylinders,
-                Transmission, Fuel_Type, Color, Location 
-            FROM car_info
-            WHERE Make = %s AND Model = %s
-            ORDER BY Year DESC, Price ASC
-        """
-        
-        cursor.execute(query, (make, model))
-        similar_cars = cursor.fetchall()
         
-        print(f"查询结果: 找到 {len(similar_cars)} 辆同型号车辆")
+        if page < 1:
+            page = 1
+        if limit < 1 or limit > app_config.MAX_PAGE_SIZE:
+            limit = app_config.DEFAULT_PAGE_SIZE
         
-        # 如果没有找到数据，尝试使用模糊匹配
-        if not similar_cars:
+        # 统计直接读取预先汇总的结果，精确匹配不到时在型号字典上模糊匹配
+        # 输入过短时（如 "a"）包含匹配几乎命中所有型号，跳过；命中的型号数也有上限，避免合并过多型号和过长的 OR 条件
+        entries = model_price_stats.exact(make, model)
+        match = 'exact'
+        min_length = app_config.SIMILAR_MODELS_FUZZY_MIN_LENGTH
+        if not entries and len(make.strip()) >= min_length and len(model.strip()) >= min_length:
             print(f"未找到精确匹配的车辆，尝试模糊匹配...")
-            fuzzy_query = """
-                SELECT 
-                    id, Make, Model, Year, Price, Mileage, Body_Type, Cylinders,
-                    Transmission, Fuel_Type, Color, Location 
-                FROM car_info
-                WHERE Make LIKE %s AND Model LIKE %s
-                ORDER BY Year DESC, Price ASC
-            """
-            cursor.execute(fuzzy_query, (f"%{make}%", f"%{model}%"))
-            similar_cars = cursor.fetchall()
-            print(f"模糊匹配结果: 找到 {len(similar_cars)} 辆相似车辆")
-        
-        # 计算平均价格和价格范围
-        if similar_cars:
-            prices = [car['Price'] for car in similar_cars]
-            avg_price = sum(prices) / len(prices)
-            min_price = min(prices)
-            max_price = max(prices)
-            
-            # 打印第一辆车的详细信息作为调试
-            print(f"第一辆车信息: {similar_cars[0]}")
-            
-            # 计算价格分布
-            price_distribution = {}
-            for car in similar_cars:
-                year = car['Year']
-                if year not in price_distribution:
-                    price_distribution[year] = []
-                price_distribution[year].append(car['Price'])
-            
-            price_by_year = []
-            for year, prices in price_distribution.items():
-                price_by_year.append({
-                    'year': year,
-                    'avg_price': sum(prices) / len(prices),
-                    'min_price': min(prices),
-                    'max_price': max(prices),
-                    'count': len(prices)
-                })
-            
-            # 排序
-            price_by_year.sort(key=lambda x: x['year'], reverse=True)
+            entries = model_price_stats.fuzzy(make, model, app_config.SIMILAR_MODELS_MAX_FUZZY)
+            match = 'fuzzy'
+        resolved = None
+        if not entries:
+            # 包含匹配也找不到时（如拼写错误），按三元组相似度解析为最接近的品牌、型号
+            pair = make_model_vocabulary.get().closest_pair(make, model, app_config.FUZZY_MATCH_THRESHOLD)
+            if pair is not None:
+                entries = model_price_stats.exact(*pair)
+                match = 'similar'
+                resolved = {'make': pair[0], 'model': pair[1]}
+        stats, price_by_year, rows = model_price_stats.summarize(entries)
+        print(f"查询结果: 找到 {len(entries)} 个型号共 {rows} 辆车（{match}）")
+        
+        # 只查询当前页的车辆
+        similar_cars = []
+        if entries:
+            conn = get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+            try:
+                conditions = " OR ".join(["(Make = %s AND Model = %s)"] * len(entries))
+                params = [value for entry in entries for value in (entry.make, entry.model)]
+                query = f"""
+                    SELECT 
+                        id, Make, Model, Year, Price, Mileage, Body_Type, Cylinders,
+                        Transmission, Fuel_Type, Color, Location 
+                    FROM car_info
+                    WHERE {conditions}
+                    ORDER BY Year DESC, Price ASC, id ASC
+                    LIMIT %s OFFSET %s
+                """
+                cursor.execute(query, params + [limit, (page - 1) * limit])
+                similar_cars = cursor.fetchall()
+            finally:
+                cursor.close()
+                conn.close()
         else:
-            avg_price = 0
-            min_price = 0
-            max_price = 0
-            price_by_year = []
-            
             # 如果依然没有数据，记录警告
             print(f"警告: 无法在数据库中找到品牌为 {make} 型号为 {model} 的车辆")
         
-        # 关闭连接
-        cursor.close()
-        conn.close()
-        
         return jsonify({
             'status': 'success',
             'data': {
                 'similar_cars': similar_cars,
-                'stats': {
-                    'avg_price': avg_price,
-                    'min_price': min_price,
-                    'max_price': max_price,
-                    'count': len(similar_cars)
-                },
-                'price_by_year': price_by_year
+                'stats': stats,
+                'price_by_year': price_by_year,
+                'match': match if entries else None,
+                'resolved': resolved,
+                'page': page,
+                'limit': limit,
+                'total': rows,
+                'total_pages': (rows + limit - 1) // limit
             }
         }), 200
             
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+可比车辆检索基准测试
+
+把 car_info 的数据复制为原来的 10 倍、100 倍（分配新的id），测量按 (Make, Model) 分区建立 KD 树的耗时，
+以及随机抽取车辆查询最近 k 辆车的延迟；同时在同一分区上逐行计算距离作为对照，并核对两者的距离完全一致
+
+用法:
+    python bench_comps.py [--scales 1,10,100] [--queries 200] [--k 10]
+"""
+
+import argparse
+import random
+import time
+import mysql.connector
+import numpy as np
+from config import app_config
+from comps_index import CompsIndex, COMPS_COLUMNS
+
+# 数据库配置
+db_config = {
+    'host': app_config.DB_HOST,
+    'user': app_config.DB_USER,
+    'password': app_config.DB_PASSWORD,
+    'database': app_config.DB_NAME
+}
+
+
+def get_db_connection():
+    """获取数据库连接"""
+    return mysql.connector.connect(**db_config)
+
+
+def load_rows():
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(f"SELECT {', '.join(COMPS_COLUMNS)} FROM car_info")
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def replicate(rows, scale):
+    """把数据复制 scale 份，每份的id整体平移，保持各份之间互不重复"""
+    if scale == 1:
+        return rows
+    max_id = max(row['id'] for row in rows)
+    return [dict(row, id=row['id'] + copy * max_id) for copy in range(scale) for row in rows]
+
+
+def scan(index, vehicle, k, exclude_id):
+    """对照组：在分区内逐行计算距离后排序"""
+    partition = index.partition(vehicle['Make'], vehicle['Model'])
+    point, correction = partition.vector(vehicle, index.scales)
+    distances = np.sqrt(np.maximum(((partition.points - point) ** 2).sum(axis=1) + correction, 0))
+    distances = distances[partition.ids != exclude_id]
+    return np.sort(distances)[:k]
+
+
+def measure(index, targets, k):
+    tree_samples = []
+    scan_samples = []
+    mismatches = 0
+    for vehicle in targets:
+        start = time.perf_counter()
+        _, neighbours = index.query(vehicle, k, vehicle['id'])
+        tree_samples.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        expected = scan(index, vehicle, k, vehicle['id'])
+        scan_samples.append((time.perf_counter() - start) * 1000)
+
+        if not np.allclose([distance for _, distance, _ in neighbours], expected):
+            mismatches += 1
+    return tree_samples, scan_samples, mismatches
+
+
+def main(args):
+    rows = load_rows()
+    print(f"从 car_info 读取 {len(rows)} 行")
+    rows = [row for row in rows if row['Make'] is not None and row['Model'] is not None]
+    targets = random.Random(0).sample(rows, min(args.queries, len(rows)))
+
+    for scale in args.scales:
+        index = CompsIndex(replicate(rows, scale))
+        largest = max(partition.size for partition in index.partitions.values())
+        print(f"\n== {scale}x: {index.size} 行，{len(index.partitions)} 个分区（最大 {largest} 行），"
+              f"构建 {index.build_seconds:.2f}s ==")
+        tree_samples, scan_samples, mismatches = measure(index, targets, args.k)
+        for name, samples in (('KD 树', tree_samples), ('分区内逐行扫描', scan_samples)):
+            print(f"{name:<12} p50 {np.percentile(samples, 50):>8.3f}ms  p99 {np.percentile(samples, 99):>8.3f}ms")
+        if mismatches:
+            print(f"❌ {mismatches}/{len(targets)} 个查询的距离与逐行扫描不一致")
+        else:
+            print(f"✅ {len(targets)} 个查询的距离与逐行扫描一致")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='可比车辆 KD 树检索的构建耗时和查询延迟')
+    parser.add_argument('--scales', default='1,10,100', help='数据放大倍数，逗号分隔')
+    parser.add_argument('--queries', type=int, default=200, help='随机抽取的查询车辆数')
+    parser.add_argument('--k', type=int, default=10, help='每次返回的车辆数')
+    args = parser.parse_args()
+    args.scales = [int(scale) for scale in args.scales.split(',')]
+    main(args)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+内存搜索引擎基准测试
+
+先在当前数据上逐条对比内存引擎与 SQL 查询的结果（总数和首页id必须完全一致，包括按价格、日期等排序），
+再把 car_info 的数据复制为原来的 10 倍、100 倍（分配新的id），测量构建耗时、列数组内存和各类查询的延迟
+
+用法:
+    python bench_search_engine.py [--scales 1,10,100] [--repeat 20]
+"""
+
+import argparse
+import time
+import mysql.connector
+import numpy as np
+from config import app_config
+from car_query import parse_car_filters, filters_to_sql, parse_sort, order_by_sql
+from car_search_engine import CarTable, LISTING_COLUMNS
+
+# 数据库配置
+db_config = {
+    'host': app_config.DB_HOST,
+    'user': app_config.DB_USER,
+    'password': app_config.DB_PASSWORD,
+    'database': app_config.DB_NAME
+}
+
+# 与列表接口相同的查询参数
+QUERIES = [
+    ('无筛选', {}),
+    ('品牌包含', {'make': 'mer'}),
+    ('品牌精确+年份', {'make': 'toyota', 'match': 'exact', 'year_min': '2015'}),
+    ('型号前缀', {'model': 'land', 'match': 'prefix'}),
+    ('价格区间+车身', {'price_min': '100000', 'price_max': '300000', 'body_type': 'SUV'}),
+    ('多条件', {'make': 'bmw', 'year_min': '2010', 'mileage_max': '150000', 'fuel_type': 'Gasoline', 'color': 'White'}),
+    ('无结果', {'make': 'no-such-make'}),
+    ('价格降序', {'sort': 'price'}),
+    ('品牌+日期升序', {'make': 'mer', 'sort': 'date', 'order': 'asc'}),
+    ('年份+里程升序', {'year_min': '2015', 'sort': 'mileage', 'order': 'asc'})
+]
+
+
+def get_db_connection():
+    """获取数据库连接"""
+    return mysql.connector.connect(**db_config)
+
+
+def load_rows():
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(f"SELECT {', '.join(LISTING_COLUMNS)} FROM car_info")
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def sql_search(cursor, args, limit):
+    conditions, params = filters_to_sql(parse_car_filters(args))
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    cursor.execute(f"SELECT COUNT(*) as total FROM car_info{where}", params)
+    total = cursor.fetchone()['total']
+    cursor.execute(f"SELECT id FROM car_info{where} {order_by_sql(*parse_sort(args))} LIMIT %s", params + [limit])
+    return [row['id'] for row in cursor.fetchall()], total
+
+
+def replicate(rows, scale):
+    """把数据复制 scale 份，每份的id整体平移，保持各份之间互不重复"""
+    if scale == 1:
+        return rows
+    max_id = max(row['id'] for row in rows)
+    return [dict(row, id=row['id'] + copy * max_id) for copy in range(scale) for row in rows]
+
+
+def check_parity(table, limit):
+    """逐条对比内存引擎与 SQL 查询的结果"""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    passed = 0
+    try:
+        for name, args in QUERIES:
+            sql_ids, sql_total = sql_search(cursor, args, limit)
+            cars, total, _ = table.search(parse_car_filters(args), 0, limit, None, *parse_sort(args))
+            ids = [car['id'] for car in cars]
+            if ids == sql_ids and total == sql_total:
+                passed += 1
+                print(f"✅ {name}: 共 {total} 条，首页一致")
+            else:
+                print(f"❌ {name}: SQL 共 {sql_total} 条 {sql_ids[:5]}，内存引擎共 {total} 条 {ids[:5]}")
+        start = time.perf_counter()
+        for _ in range(5):
+            for _, args in QUERIES:
+                sql_search(cursor, args, limit)
+        print(f"SQL 平均每次查询（含COUNT）: {(time.perf_counter() - start) / 5 / len(QUERIES) * 1000:.2f}ms")
+    finally:
+        cursor.close()
+        conn.close()
+    print(f"一致性: {passed}/{len(QUERIES)}")
+
+
+def measure(table, repeat, limit):
+    timings = {}
+    for name, args in QUERIES:
+        filters = parse_car_filters(args)
+        sort_column, order = parse_sort(args)
+        # 排序名次在首次使用时构建，不计入查询延迟
+        table.sort_index(sort_column)
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            table.search(filters, 0, limit, None, sort_column, order)
+            samples.append((time.perf_counter() - start) * 1000)
+        timings[name] = (np.percentile(samples, 50), np.percentile(samples, 99))
+    return timings
+
+
+def main(args):
+    rows = load_rows()
+    print(f"从 car_info 读取 {len(rows)} 行")
+
+    for scale in args.scales:
+        table = CarTable(replicate(rows, scale))
+        print(f"\n== {scale}x: {table.size} 行，构建 {table.build_seconds:.2f}s，"
+              f"列数组 {table.memory_bytes() / 1024 / 1024:.1f}MB ==")
+        if scale == 1:
+            check_parity(table, args.limit)
+        for name, (p50, p99) in measure(table, args.repeat, args.limit).items():
+            print(f"{name:<16} p50 {p50:>8.3f}ms  p99 {p99:>8.3f}ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='内存搜索引擎与 SQL 查询的一致性和延迟对比')
+    parser.add_argument('--scales', default='1,10,100', help='数据放大倍数，逗号分隔')
+    parser.add_argument('--repeat', type=int, default=20, help='每个查询的重复次数')
+    parser.add_argument('--limit', type=int, default=10, help='每页数量')
+    args = parser.parse_args()
+    args.scales = [int(scale) for scale in args.scales.split(',')]
+    main(args)
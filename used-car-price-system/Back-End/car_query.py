@@ -0,0 +1,243 @@
+"""
+车辆查询条件模块
+
+把 /api/v1/cars 的筛选参数转换为 SQL 条件（文本字段支持包含、精确、前缀三种匹配方式），并提供排序和键集分页使用的游标编解码：
+游标是对上一页最后一行排序键 (排序列, id) 的不透明编码，下一页据此改为 WHERE (排序列, id) < (?, ?) 的索引范围扫描，
+不再像 OFFSET 那样扫描并丢弃前面所有的行
+"""
+import base64
+import json
+
+# 模糊匹配的文本筛选参数及对应的列
+TEXT_FILTERS = [
+    ('make', 'Make'),
+    ('model', 'Model'),
+    ('body_type', 'Body_Type'),
+    ('fuel_type', 'Fuel_Type'),
+    ('transmission', 'Transmission'),
+    ('color', 'Color'),
+    ('location', 'Location')
+]
+
+# 文本筛选的匹配方式: contains 为原有的 LIKE '%值%'，exact 和 prefix 可以使用列上的索引
+MATCH_MODES = ('contains', 'exact', 'prefix')
+
+# 范围筛选参数及对应的列和比较符
+RANGE_FILTERS = [
+    ('year_min', 'Year', '>='),
+    ('year_max', 'Year', '<='),
+    ('price_min', 'Price', '>='),
+    ('price_max', 'Price', '<='),
+    ('mileage_min', 'Mileage', '>='),
+    ('mileage_max', 'Mileage', '<=')
+]
+
+
+# 可排序的字段: 参数取值 -> 列名
+SORT_FIELDS = {
+    'id': 'id',
+    'price': 'Price',
+    'mileage': 'Mileage',
+    'year': 'Year',
+    'date': 'Date'
+}
+
+
+# 按取值计数的分面字段，以及按固定宽度分桶计数的数值字段
+FACET_COLUMNS = ['Make', 'Body_Type', 'Fuel_Type', 'Transmission', 'Color', 'Location']
+RANGE_FACET_COLUMNS = ['Year', 'Price', 'Mileage']
+
+
+def escape_like(value):
+    """转义 LIKE 中的通配符，使前缀匹配只匹配字面值"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def text_condition(column, value, match):
+    """按匹配方式构建单个文本列的筛选条件 (列, 运算符, 参数)"""
+    if match == 'exact':
+        return (column, '=', value)
+    if match == 'prefix':
+        return (column, 'LIKE', f"{escape_like(value)}%")
+    return (column, 'LIKE', f"%{value}%")
+
+
+def parse_car_filters(args):
+    """
+    解析请求中的筛选参数
+    参数:
+        args: 请求参数（request.args 或普通字典），match 指定文本字段的匹配方式，默认contains
+    返回:
+        筛选条件列表，每项为 (列, 运算符, 参数)，运算符为 =、LIKE、>= 或 <=；
+        match 取值不合法时抛出ValueError
+    """
+    match = (args.get('match') or 'contains').lower()
+    if match not in MATCH_MODES:
+        raise ValueError(f'match 只能是 {", ".join(MATCH_MODES)} 之一')
+
+    filters = []
+
+    # 保持与原接口相同的条件顺序：先品牌、型号，再数值范围，最后其余文本字段
+    for name, column in TEXT_FILTERS[:2]:
+        if args.get(name):
+            filters.append(text_condition(column, args.get(name), match))
+
+    for name, column, operator in RANGE_FILTERS:
+        if args.get(name):
+            filters.append((column, operator, int(args.get(name))))
+
+    for name, column in TEXT_FILTERS[2:]:
+        if args.get(name):
+            filters.append(text_condition(column, args.get(name), match))
+
+    return filters
+
+
+def filters_to_sql(filters):
+    """
+    把筛选条件转换为SQL
+    返回:
+        (conditions, params)，conditions 为SQL条件列表，params 为对应的参数列表
+    """
+    conditions = [f"{column} {operator} %s" for column, operator, _ in filters]
+    params = [param for _, _, param in filters]
+    return conditions, params
+
+
+def build_car_filters(args):
+    """根据请求参数构建SQL筛选条件，返回 (conditions, params)"""
+    return filters_to_sql(parse_car_filters(args))
+
+
+def filter_signature(conditions, params):
+    """
+    筛选条件的规范化签名，用作总数缓存的键
+    文本列使用不区分大小写的排序规则，LIKE 参数统一转为小写，大小写不同的同一查询共用缓存
+    """
+    return tuple(conditions) + tuple(
+        param.lower() if isinstance(param, str) else param for param in params
+    )
+
+
+def facet_values(counts):
+    """
+    把 {取值: 数量} 转换为分面列表，按数量从多到少排列，数量相同时按取值排列
+    NULL 无法作为筛选条件，不出现在结果中
+    """
+    items = [(value, count) for value, count in counts.items() if value is not None and count > 0]
+    items.sort(key=lambda item: (-item[1], str(item[0])))
+    return [{'value': value, 'count': int(count)} for value, count in items]
+
+
+def range_buckets(counts, width):
+    """
+    把 {桶序号: 数量} 转换为区间列表，桶序号为 FLOOR(值 / width)
+    min 和 max 都包含在区间内，可以直接作为 *_min、*_max 筛选参数
+    """
+    return [
+        {'min': int(bucket) * width, 'max': (int(bucket) + 1) * width - 1, 'count': int(count)}
+        for bucket, count in sorted(counts.items()) if bucket is not None and count > 0
+    ]
+
+
+def parse_car_ids(values, max_ids):
+    """
+    解析批量查询的车辆id，支持逗号分隔的字符串或列表，去重后保持原有顺序
+    id不是正整数或数量超过 max_ids 时抛出ValueError
+    """
+    if isinstance(values, str):
+        values = [value for value in values.split(',') if value.strip()]
+    if not isinstance(values, list) or not values:
+        raise ValueError('请提供车辆id')
+    ids = []
+    seen = set()
+    for value in values:
+        try:
+            car_id = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'无效的车辆id: {value}')
+        if isinstance(value, bool) or car_id < 1:
+            raise ValueError(f'无效的车辆id: {value}')
+        if car_id not in seen:
+            seen.add(car_id)
+            ids.append(car_id)
+    if len(ids) > max_ids:
+        raise ValueError(f'单次最多查询 {max_ids} 辆车')
+    return ids
+
+
+def parse_sort(args):
+    """
+    解析排序参数
+    返回:
+        (列名, 方向)，默认按 id 倒序；取值不合法时抛出ValueError
+    """
+    sort = (args.get('sort') or 'id').lower()
+    if sort not in SORT_FIELDS:
+        raise ValueError(f'sort 只能是 {", ".join(SORT_FIELDS)} 之一')
+    order = (args.get('order') or 'desc').lower()
+    if order not in ('asc', 'desc'):
+        raise ValueError('order 只能是 asc 或 desc')
+    return SORT_FIELDS[sort], order
+
+
+def order_by_sql(column, order):
+    """
+    排序子句，非 id 排序时以 id 作为第二排序键保证顺序唯一；
+    InnoDB 二级索引的叶子节点包含主键，单列索引即可按 (列, id) 顺序扫描而无需 filesort
+    """
+    direction = order.upper()
+    if column == 'id':
+        return f"ORDER BY id {direction}"
+    return f"ORDER BY {column} {direction}, id {direction}"
+
+
+def keyset_condition(column, order, key, last_id):
+    """
+    游标分页的范围条件，取排在 (key, last_id) 之后的行
+    MySQL 中 NULL 在升序时排在最前、降序时排在最后，需要单独处理
+    返回:
+        (condition, params)
+    """
+    if column == 'id':
+        return ("id < %s", [last_id]) if order == 'desc' else ("id > %s", [last_id])
+    if order == 'desc':
+        if key is None:
+            return f"({column} IS NULL AND id < %s)", [last_id]
+        return f"(({column}, id) < (%s, %s) OR {column} IS NULL)", [key, last_id]
+    if key is None:
+        return f"(({column} IS NULL AND id > %s) OR {column} IS NOT NULL)", [last_id]
+    return f"({column}, id) > (%s, %s)", [key, last_id]
+
+
+def encode_cursor(row, column='id', order='desc'):
+    """把一页最后一行的排序键编码为不透明的游标字符串"""
+    payload = {'id': row['id']}
+    if column != 'id' or order != 'desc':
+        payload.update({'s': column, 'o': order, 'k': row[column] if column != 'id' else None})
+    payload = json.dumps(payload, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, column='id', order='desc'):
+    """
+    解析游标，游标必须与本次请求的排序方式一致
+    返回:
+        (上一页最后一行的排序键, 上一页最后一行的id)；游标无法解析时抛出ValueError
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        last_id = int(payload['id'])
+        sort = (payload.get('s', 'id'), payload.get('o', 'desc'))
+        key = payload.get('k')
+    except (ValueError, TypeError, KeyError, AttributeError, UnicodeError):
+        raise ValueError('无效的分页游标')
+    if sort != (column, order):
+        raise ValueError('分页游标与本次请求的排序方式不一致')
+    if key is not None:
+        try:
+            key = str(key) if column == 'Date' else int(key)
+        except (ValueError, TypeError):
+            raise ValueError('无效的分页游标')
+    return key, last_id
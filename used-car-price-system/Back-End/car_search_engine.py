@@ -0,0 +1,413 @@
+"""
+内存列式车辆搜索引擎
+
+把 car_info 的列表字段一次性加载为 NumPy 列：数值列为 int64 数组加空值掩码，
+文本列做字典编码（每行只存整数编码），低基数列还预先为每个取值建立按位压缩的位图。
+筛选时先在字典上求值（取值数远小于行数），再用位图或编码查表得到行掩码，
+多个条件按位与后分页，结果与 SQL 查询完全一致；按其他列排序时用预先算好的全局名次做 top-k 选择。
+分面统计在同一次筛选结果上对编码和分桶序号做 bincount，不需要逐个分面重新查询。
+数据版本变化时整体重建
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+import numpy as np
+from car_query import FACET_COLUMNS, RANGE_FACET_COLUMNS, facet_values, range_buckets
+
+# 列表接口返回的字段，与 SQL 查询的列顺序一致
+LISTING_COLUMNS = [
+    'id', 'Make', 'Model', 'Year', 'Price', 'Mileage', 'Body_Type',
+    'Cylinders', 'Transmission', 'Fuel_Type', 'Color', 'Location',
+    'Date', 'Description'
+]
+
+NUMERIC_COLUMNS = ['Year', 'Price', 'Mileage', 'Cylinders']
+CATEGORICAL_COLUMNS = ['Make', 'Model', 'Body_Type', 'Transmission', 'Fuel_Type', 'Color', 'Location', 'Date']
+
+# 可排序的列
+SORT_COLUMNS = ['id', 'Year', 'Price', 'Mileage', 'Date']
+# NULL 的排序键，与 MySQL 一样在升序时排在最前
+NULL_KEY = np.iinfo(np.int64).min
+
+# 取值数不超过该值的列预先建立每个取值的位图
+BITMAP_MAX_CARDINALITY = 256
+# 匹配的取值数不超过该值时合并位图，否则直接按编码查表
+BITMAP_MAX_MATCHES = 8
+
+
+def like_to_regex(pattern):
+    """
+    把 SQL LIKE 模式转换为正则表达式
+    % 匹配任意字符串，_ 匹配单个字符，反斜杠转义下一个字符；与 utf8mb4_general_ci 一样不区分大小写
+    """
+    parts = []
+    escaped = False
+    for char in pattern:
+        if escaped:
+            parts.append(re.escape(char))
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char == '%':
+            parts.append('.*')
+        elif char == '_':
+            parts.append('.')
+        else:
+            parts.append(re.escape(char))
+    if escaped:
+        parts.append(re.escape('\\'))
+    return re.compile(''.join(parts), re.IGNORECASE | re.DOTALL)
+
+
+def collation_key(value):
+    """utf8mb4_general_ci 下的比较键：不区分大小写，忽略尾部空格"""
+    return str(value).rstrip(' ').lower()
+
+
+def value_matcher(operator, param):
+    """返回判断单个文本取值是否满足条件的函数，NULL 不满足任何条件"""
+    if operator == 'LIKE':
+        regex = like_to_regex(str(param))
+        return lambda value: value is not None and regex.fullmatch(str(value)) is not None
+    if operator == '=':
+        # PAD SPACE 排序规则下比较时忽略尾部空格
+        target = collation_key(param)
+        return lambda value: value is not None and collation_key(value) == target
+    raise ValueError(f'文本列不支持的运算符: {operator}')
+
+
+class CategoricalColumn:
+    """字典编码的文本列"""
+
+    def __init__(self, values):
+        index = {}
+        self.codes = np.fromiter(
+            (index.setdefault(value, len(index)) for value in values), dtype=np.int32, count=len(values)
+        )
+        self.dictionary = list(index)
+        self.bitmaps = None
+        if len(self.dictionary) <= BITMAP_MAX_CARDINALITY:
+            self.bitmaps = [np.packbits(self.codes == code) for code in range(len(self.dictionary))]
+
+    def match(self, operator, param):
+        """返回满足条件的行的压缩位图"""
+        matcher = value_matcher(operator, param)
+        matched = np.fromiter(
+            (matcher(value) for value in self.dictionary), dtype=bool, count=len(self.dictionary)
+        )
+        matched_codes = np.flatnonzero(matched)
+        if self.bitmaps is not None and len(matched_codes) <= BITMAP_MAX_MATCHES:
+            if len(matched_codes) == 0:
+                return np.zeros((len(self.codes) + 7) // 8, dtype=np.uint8)
+            bitmap = self.bitmaps[matched_codes[0]].copy()
+            for code in matched_codes[1:]:
+                bitmap |= self.bitmaps[code]
+            return bitmap
+        return np.packbits(matched[self.codes])
+
+    def value(self, row):
+        return self.dictionary[self.codes[row]]
+
+
+class NumericColumn:
+    """整数列，NULL 记录在单独的掩码中"""
+
+    def __init__(self, values):
+        self.null = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+        self.values = np.fromiter(
+            (0 if value is None else value for value in values), dtype=np.int64, count=len(values)
+        )
+
+    def match(self, operator, param):
+        if operator == '>=':
+            mask = self.values >= param
+        elif operator == '<=':
+            mask = self.values <= param
+        elif operator == '=':
+            mask = self.values == param
+        else:
+            raise ValueError(f'数值列不支持的运算符: {operator}')
+        return np.packbits(mask & ~self.null)
+
+    def value(self, row):
+        return None if self.null[row] else int(self.values[row])
+
+
+class SortIndex:
+    """
+    单个排序列的全局顺序：按 (排序键, id) 升序排列后每行的名次
+    降序即名次倒序，筛选后的行只需比较名次，不必每次重新排序
+    参数:
+        keys: int64 排序键，NULL 为 NULL_KEY
+        dictionary: 文本列按排序规则排好的取值列表，数值列为None
+    """
+
+    def __init__(self, keys, ids, dictionary=None):
+        order = np.lexsort((ids, keys))
+        self.rank = np.empty(len(order), dtype=np.int64)
+        self.rank[order] = np.arange(len(order))
+        self.sorted_keys = keys[order]
+        self.sorted_ids = ids[order]
+        self.dictionary = dictionary
+
+    def key_for(self, value):
+        """把游标中的排序值转换为排序键；文本取值已不存在时落在相邻取值之间"""
+        if value is None:
+            return NULL_KEY
+        if self.dictionary is None:
+            return int(value)
+        key = collation_key(value)
+        index = bisect_left(self.dictionary, key)
+        found = index < len(self.dictionary) and self.dictionary[index] == key
+        return 2 * index + 1 if found else 2 * index
+
+    def bounds(self, value, last_id):
+        """
+        返回 (left, right)：名次小于 left 的行排在 (value, last_id) 之前，
+        名次不小于 right 的行排在它之后
+        """
+        key = self.key_for(value)
+        low = np.searchsorted(self.sorted_keys, key, side='left')
+        high = np.searchsorted(self.sorted_keys, key, side='right')
+        ids = self.sorted_ids[low:high]
+        return (low + np.searchsorted(ids, last_id, side='left'),
+                low + np.searchsorted(ids, last_id, side='right'))
+
+
+class CarTable:
+    """
+    某一数据版本的列式快照，创建后不再修改
+    参数:
+        rows: 车辆字典列表，包含 LISTING_COLUMNS 中的全部字段
+    """
+
+    def __init__(self, rows, version=None):
+        started = time.perf_counter()
+        # 行按 id 倒序存放，行号顺序即列表接口的默认顺序
+        rows = sorted(rows, key=lambda row: row['id'], reverse=True)
+        self.version = version
+        self.size = len(rows)
+        self.ids = np.fromiter((row['id'] for row in rows), dtype=np.int64, count=len(rows))
+        # 取负后为升序，供游标定位时二分查找
+        self._negated_ids = -self.ids
+        self.columns = {}
+        for column in NUMERIC_COLUMNS:
+            self.columns[column] = NumericColumn([row[column] for row in rows])
+        for column in CATEGORICAL_COLUMNS:
+            self.columns[column] = CategoricalColumn([row[column] for row in rows])
+        self.descriptions = [row['Description'] for row in rows]
+        self._sort_indexes = {}
+        self.loaded_at = time.time()
+        self.build_seconds = time.perf_counter() - started
+
+    def id_bitmap(self, ids):
+        """把一组 id（如全文检索的结果）转换为行的压缩位图，不在本快照中的 id 被忽略"""
+        mask = np.zeros(self.size, dtype=bool)
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) and self.size:
+            positions = np.searchsorted(self._negated_ids, -ids)
+            positions[positions == self.size] = 0
+            mask[positions[self.ids[positions] == ids]] = True
+        return np.packbits(mask)
+
+    def filter(self, filters, ids=None):
+        """
+        按筛选条件求出匹配的行号
+        参数:
+            filters: car_query.parse_car_filters 返回的 (列, 运算符, 参数) 列表
+            ids: 限定的 id 集合，为None时不限定
+        返回:
+            按 id 倒序排列的行号数组
+        """
+        bitmap = self.id_bitmap(ids) if ids is not None else None
+        for column, operator, param in filters:
+            matched = self.columns[column].match(operator, param)
+            bitmap = matched if bitmap is None else np.bitwise_and(bitmap, matched, out=bitmap)
+        if bitmap is None:
+            return np.arange(self.size)
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.size))
+
+    def sort_index(self, column):
+        """按需构建并缓存排序列的 SortIndex"""
+        index = self._sort_indexes.get(column)
+        if index is not None:
+            return index
+        if column == 'id':
+            index = SortIndex(self.ids, self.ids)
+        elif isinstance(self.columns[column], NumericColumn):
+            values = self.columns[column]
+            index = SortIndex(np.where(values.null, NULL_KEY, values.values), self.ids)
+        else:
+            # 文本列按排序规则排好字典后，每个取值的排序键为 2*名次+1，游标中已不存在的取值可以落在两者之间
+            values = self.columns[column]
+            dictionary = sorted({collation_key(value) for value in values.dictionary if value is not None})
+            ranks = {value: 2 * index + 1 for index, value in enumerate(dictionary)}
+            lookup = np.array([
+                NULL_KEY if value is None else ranks[collation_key(value)] for value in values.dictionary
+            ], dtype=np.int64)
+            index = SortIndex(lookup[values.codes], self.ids, dictionary)
+        self._sort_indexes[column] = index
+        return index
+
+    def top_k(self, positions, column, order, offset, limit, after=None):
+        """
+        从筛选结果中取出排序后的第 offset 到 offset+limit 行（多取一行用于判断是否还有下一页）
+        用 argpartition 只选出前 offset+limit+1 名再排序，不对全部匹配行排序
+        """
+        index = self.sort_index(column)
+        ranks = index.rank[positions]
+        if after is not None:
+            value, last_id = after
+            # 按 id 排序时游标中不单独记录排序值
+            left, right = index.bounds(last_id if column == 'id' else value, last_id)
+            keep = ranks < left if order == 'desc' else ranks >= right
+            positions = positions[keep]
+            ranks = ranks[keep]
+        if order == 'desc':
+            ranks = -ranks
+
+        k = offset + limit + 1
+        if len(ranks) > k:
+            selected = np.argpartition(ranks, k - 1)[:k]
+        else:
+            selected = np.arange(len(ranks))
+        selected = selected[np.argsort(ranks[selected])]
+        return positions[selected][offset:]
+
+    def row(self, position):
+        car = {'id': int(self.ids[position])}
+        for column in LISTING_COLUMNS[1:-1]:
+            car[column] = self.columns[column].value(position)
+        car['Description'] = self.descriptions[position]
+        return car
+
+    def search(self, filters, offset=0, limit=10, after=None, sort='id', order='desc', ids=None):
+        """
+        筛选、排序并分页
+        参数:
+            ids: 限定的 id 集合（全文检索的结果），为None时不限定
+            after: 游标分页时上一页最后一行的 (排序值, id)，只返回排在它之后的行
+            sort: 排序列，SORT_COLUMNS 之一
+            order: asc 或 desc
+        返回:
+            (cars, total, has_more)，cars 最多 limit 条，total 为不考虑游标时的匹配总数
+        """
+        positions = self.filter(filters, ids)
+        total = len(positions)
+        if sort == 'id' and order == 'desc':
+            # 默认顺序即行号顺序，直接切片
+            if after is not None:
+                # ids 为倒序，id 小于游标的行从 start 开始
+                start = np.searchsorted(self._negated_ids, -after[1], side='right')
+                positions = positions[np.searchsorted(positions, start):]
+            page = positions[offset:offset + limit + 1]
+        else:
+            page = self.top_k(positions, sort, order, offset, limit, after)
+        cars = [self.row(position) for position in page[:limit]]
+        return cars, total, len(page) > limit
+
+    def facets(self, filters, widths, ids=None):
+        """
+        统计筛选结果中各分面字段的取值分布和数值字段的分桶分布
+        参数:
+            widths: {数值列: 分桶宽度}
+        返回:
+            (total, facets, ranges)
+        """
+        positions = self.filter(filters, ids)
+        facets = {}
+        for column in FACET_COLUMNS:
+            values = self.columns[column]
+            counts = np.bincount(values.codes[positions], minlength=len(values.dictionary))
+            # 与 SQL 的 GROUP BY 一致，按排序规则相同的取值合并计数，保留先出现的写法
+            merged = {}
+            names = {}
+            for value, count in zip(values.dictionary, counts):
+                if value is None or not count:
+                    continue
+                key = collation_key(value)
+                names.setdefault(key, value)
+                merged[key] = merged.get(key, 0) + int(count)
+            facets[column] = facet_values({names[key]: count for key, count in merged.items()})
+
+        ranges = {}
+        for column in RANGE_FACET_COLUMNS:
+            values = self.columns[column]
+            selected = values.values[positions][~values.null[positions]]
+            buckets, counts = np.unique(selected // widths[column], return_counts=True)
+            ranges[column] = range_buckets(dict(zip(buckets.tolist(), counts.tolist())), widths[column])
+        return len(positions), facets, ranges
+
+    def memory_bytes(self):
+        """列数组占用的内存（不含文本字典和描述字符串）"""
+        total = self.ids.nbytes
+        for column in self.columns.values():
+            if isinstance(column, NumericColumn):
+                total += column.values.nbytes + column.null.nbytes
+            else:
+                total += column.codes.nbytes + sum(bitmap.nbytes for bitmap in column.bitmaps or [])
+        return total
+
+
+class CarSearchEngine:
+    """
+    内存搜索引擎，持有当前数据版本的 CarTable
+    参数:
+        connect: 返回数据库连接的函数
+        data_version: DataVersion 实例，版本变化时重新加载
+    """
+
+    def __init__(self, connect, data_version):
+        self.connect = connect
+        self.data_version = data_version
+        self._table = None
+        self._lock = threading.Lock()
+
+    def _load(self, version):
+        conn = self.connect()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(f"SELECT {', '.join(LISTING_COLUMNS)} FROM car_info")
+            table = CarTable(cursor.fetchall(), version)
+        finally:
+            cursor.close()
+            conn.close()
+        # 在替换快照前建好所有排序名次，避免切换后的首个排序请求承担构建开销
+        for column in SORT_COLUMNS:
+            table.sort_index(column)
+        return table
+
+    def refresh(self, force=True):
+        """重新加载数据，新快照构建完成后再替换，加载期间的请求继续使用旧快照"""
+        with self._lock:
+            version = self.data_version.get(force=force)
+            if force or self._table is None or self._table.version != version:
+                self._table = self._load(version)
+            return self._table
+
+    def table(self):
+        """返回当前快照，数据版本变化时先重新加载"""
+        table = self._table
+        if table is None or table.version != self.data_version.get():
+            table = self.refresh(force=False)
+        return table
+
+    def search(self, filters, offset=0, limit=10, after=None, sort='id', order='desc', ids=None):
+        return self.table().search(filters, offset, limit, after, sort, order, ids)
+
+    def facets(self, filters, widths, ids=None):
+        return self.table().facets(filters, widths, ids)
+
+    def stats(self):
+        table = self._table
+        if table is None:
+            return {'loaded': False}
+        return {
+            'loaded': True,
+            'rows': table.size,
+            'version': list(table.version) if table.version else None,
+            'loaded_at': table.loaded_at,
+            'build_seconds': table.build_seconds,
+            'memory_mb': table.memory_bytes() / 1024 / 1024
+        }
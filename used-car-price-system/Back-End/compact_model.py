@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+模型压缩脚本
+
+在当前服务使用的随机森林基础上生成更小的变体：减少树数量、限制树深度、量化节点值，
+每个变体导出为可内存映射的目录，并报告留出集误差、文件大小、加载耗时和单行预测的 p50/p99 延迟，
+以便明确地在速度和精度之间取舍。选定后设置 MODEL_VARIANT=<变体名> 即可由预测接口使用
+
+用法:
+    python compact_model.py [--variant trees=50 --variant depth=12 --variant trees=50,depth=12,levels=4096]
+"""
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+from joblib import load
+from config import app_config
+from forest_engine import CompiledForest
+from model_manager import FEATURE_ORDER
+from train_model import load_rows_by_ids, evaluate, report_path
+
+DEFAULT_VARIANTS = ['trees=50', 'depth=16', 'levels=4096', 'trees=50,depth=16,levels=4096']
+
+
+def parse_variant(spec):
+    """解析形如 trees=50,depth=12,levels=4096 的变体定义"""
+    options = {}
+    for part in spec.split(','):
+        key, _, value = part.partition('=')
+        key = key.strip()
+        if key not in ('trees', 'depth', 'levels'):
+            raise ValueError(f'不支持的变体参数: {key}')
+        options[key] = int(value)
+    return options
+
+
+def variant_name(options):
+    return '-'.join(f'{key}{options[key]}' for key in ('trees', 'depth', 'levels') if key in options) or 'full'
+
+
+def build_variant(forest, options):
+    """依次应用树数量截断、深度剪枝和节点值量化"""
+    if 'trees' in options:
+        forest = forest.truncate(options['trees'])
+    if 'depth' in options:
+        forest = forest.prune(options['depth'])
+    if 'levels' in options:
+        forest = forest.quantize(options['levels'])
+    return forest
+
+
+def directory_size_mb(directory):
+    return sum(
+        os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+    ) / 1024 / 1024
+
+
+def measure(directory, features, repeat):
+    """测量加载耗时（首次预测前）和单行预测延迟"""
+    started = time.perf_counter()
+    forest = CompiledForest.load(directory, mmap=False)
+    load_seconds = time.perf_counter() - started
+
+    timings = []
+    for i in range(repeat):
+        row = features[i % len(features)].reshape(1, -1)
+        started = time.perf_counter()
+        forest.predict(row)
+        timings.append((time.perf_counter() - started) * 1000)
+    return forest, load_seconds, np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def compact(args):
+    model = load(args.model)
+    base = CompiledForest.from_sklearn(model)
+    print(f"原模型: {base.n_trees} 棵树，{len(base.value)} 个节点，最大深度 {base.max_depth}")
+
+    # 按训练报告记录的留出集 id 读取，与训练时实际留出的行一致（增量训练的各批留出行都包括在内）
+    path = report_path(args.model)
+    try:
+        with open(path, encoding='utf-8') as f:
+            holdout_ids = json.load(f)['holdout_ids']
+    except (OSError, KeyError) as e:
+        raise SystemExit(f"训练报告 {path} 中没有留出集 id（{e}），请用 train_model.py 重新训练后再压缩")
+    print(f"读取留出集数据（{len(holdout_ids)} 个id）...")
+    _, features, prices = load_rows_by_ids(holdout_ids, args.chunk_size)
+    holdout_features = features.astype(np.float64)
+    holdout_prices = prices
+
+    variants = [('full', {})] + [(variant_name(parse_variant(spec)), parse_variant(spec)) for spec in args.variant]
+    output_dir = os.path.join(args.output_dir, 'variants')
+    os.makedirs(output_dir, exist_ok=True)
+
+    header = f"{'变体':<28}{'树':>6}{'节点':>10}{'深度':>6}{'MAE':>14}{'RMSE':>14}{'大小(MB)':>10}{'加载(s)':>9}{'p50(ms)':>9}{'p99(ms)':>9}"
+    print("\n" + header)
+    for name, options in variants:
+        forest = build_variant(base, options)
+        directory = os.path.join(output_dir, f'{name}.forest')
+        forest.save(directory, FEATURE_ORDER, extra={
+            'source': os.path.basename(args.model),
+            'variant': options
+        })
+        loaded, load_seconds, p50, p99 = measure(directory, holdout_features, args.repeat)
+        metrics = evaluate(loaded, holdout_features, holdout_prices)
+        print(f"{name:<28}{loaded.n_trees:>6}{len(loaded.value):>10}{loaded.max_depth:>6}"
+              f"{metrics['mae']:>14.0f}{metrics['rmse']:>14.0f}{directory_size_mb(directory):>10.1f}"
+              f"{load_seconds:>9.3f}{p50:>9.3f}{p99:>9.3f}")
+
+    print(f"\n变体已导出到 {output_dir}，设置 MODEL_VARIANT=<变体名> 后重启服务即可使用")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='生成并评估更小的随机森林变体')
+    parser.add_argument('--model', default=app_config.MODEL_PATH, help='joblib 模型文件，同名 .json 训练报告中需有留出集 id')
+    parser.add_argument('--output-dir', default=app_config.MODEL_DIR, help='变体输出目录（其下的 variants 子目录）')
+    parser.add_argument('--variant', action='append', help='变体定义，可重复，如 trees=50,depth=12,levels=4096')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='读取数据时每块的行数')
+    parser.add_argument('--repeat', type=int, default=300, help='测量延迟的单行预测次数')
+    args = parser.parse_args()
+    args.variant = args.variant or DEFAULT_VARIANTS
+    compact(args)
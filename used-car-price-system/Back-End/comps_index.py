@@ -0,0 +1,259 @@
+"""
+可比车辆检索模块
+
+按 (Make, Model) 把 car_info 分区，每个分区在缩放后的特征上建立 KD 树，查询时只在同品牌同型号的分区内找最近的 k 辆车。
+特征:
+    Year、Mileage、Cylinders 按全表的均值和标准差标准化；
+    Body_Type、Transmission、Fuel_Type、Color、Location 在分区内做独热编码并乘以 CATEGORY_WEIGHT / sqrt(2)，
+    任意一个分类字段不同时距离的平方增加 CATEGORY_WEIGHT ** 2，相当于数值字段相差 CATEGORY_WEIGHT 个标准差。
+数据版本变化时由 AppendTracker 核对已索引的行是否未被修改或删除：是则只重建新行所在的分区（沿用原有的缩放参数），
+否则整体重建
+"""
+import math
+import threading
+import time
+import numpy as np
+from sklearn.neighbors import KDTree
+from car_search_engine import collation_key
+from data_version import AppendTracker
+
+NUMERIC_FEATURES = ['Year', 'Mileage', 'Cylinders']
+CATEGORICAL_FEATURES = ['Body_Type', 'Transmission', 'Fuel_Type', 'Color', 'Location']
+COMPS_COLUMNS = ['id', 'Make', 'Model', 'Price'] + NUMERIC_FEATURES + CATEGORICAL_FEATURES
+
+# 一个分类字段不同相当于数值字段相差的标准差数
+CATEGORY_WEIGHT = 1.0
+LEAF_SIZE = 40
+
+
+def partition_key(make, model):
+    """分区键，品牌和型号按 utf8mb4_general_ci 的规则归并"""
+    return collation_key(make), collation_key(model)
+
+
+def category_key(value):
+    return None if value is None else collation_key(value)
+
+
+def fit_scales(rows):
+    """计算各数值特征的 (均值, 标准差)，标准差为0时取1"""
+    scales = {}
+    for column in NUMERIC_FEATURES:
+        values = np.array([row[column] for row in rows if row[column] is not None], dtype=np.float64)
+        if len(values):
+            center, scale = float(values.mean()), float(values.std())
+        else:
+            center, scale = 0.0, 1.0
+        scales[column] = (center, scale if scale > 0 else 1.0)
+    return scales
+
+
+class Partition:
+    """
+    一个 (Make, Model) 的 KD 树，创建后不再修改
+    参数:
+        make、model: 首次出现的原始写法
+        ids、prices: 车辆id和价格数组
+        numeric: 标准化后的数值特征矩阵（NULL 按均值处理，即为0）
+        categories: {字段: 归一化取值列表}
+    """
+
+    def __init__(self, make, model, ids, prices, numeric, categories):
+        self.make = make
+        self.model = model
+        self.ids = ids
+        self.prices = prices
+        self.numeric = numeric
+        self.categories = categories
+        self.vocab = {}
+        blocks = [numeric]
+        weight = CATEGORY_WEIGHT / math.sqrt(2)
+        for column in CATEGORICAL_FEATURES:
+            values = categories[column]
+            vocab = {}
+            codes = np.fromiter((vocab.setdefault(value, len(vocab)) for value in values),
+                                dtype=np.int64, count=len(values))
+            onehot = np.zeros((len(values), len(vocab)))
+            onehot[np.arange(len(values)), codes] = weight
+            self.vocab[column] = vocab
+            blocks.append(onehot)
+        self.points = np.hstack(blocks)
+        self.tree = KDTree(self.points, leaf_size=LEAF_SIZE)
+
+    @classmethod
+    def from_rows(cls, rows, scales, base=None):
+        """由车辆行构建分区，base 不为None时在其基础上追加"""
+        numeric = np.array([
+            [0.0 if row[column] is None else (row[column] - scales[column][0]) / scales[column][1]
+             for column in NUMERIC_FEATURES]
+            for row in rows
+        ], dtype=np.float64).reshape(len(rows), len(NUMERIC_FEATURES))
+        ids = np.array([row['id'] for row in rows], dtype=np.int64)
+        prices = np.array([np.nan if row['Price'] is None else row['Price'] for row in rows], dtype=np.float64)
+        categories = {column: [category_key(row[column]) for row in rows] for column in CATEGORICAL_FEATURES}
+        if base is None:
+            return cls(rows[0]['Make'], rows[0]['Model'], ids, prices, numeric, categories)
+        return cls(
+            base.make, base.model,
+            np.concatenate([base.ids, ids]),
+            np.concatenate([base.prices, prices]),
+            np.vstack([base.numeric, numeric]),
+            {column: base.categories[column] + categories[column] for column in CATEGORICAL_FEATURES}
+        )
+
+    @property
+    def size(self):
+        return len(self.ids)
+
+    def vector(self, vehicle, scales):
+        """
+        把查询车辆转换为分区内的特征向量
+        返回:
+            (向量, 距离平方的修正量)。分类取值不在分区中时，向量在该字段全为0，比实际少了 CATEGORY_WEIGHT**2 / 2；
+            未指定的分类字段同样全为0，但对所有车辆多出相同的 CATEGORY_WEIGHT**2 / 2，从距离中扣除
+        """
+        point = []
+        for column in NUMERIC_FEATURES:
+            value = vehicle.get(column)
+            center, scale = scales[column]
+            point.append(0.0 if value is None else (float(value) - center) / scale)
+
+        weight = CATEGORY_WEIGHT / math.sqrt(2)
+        correction = 0.0
+        for column in CATEGORICAL_FEATURES:
+            vocab = self.vocab[column]
+            onehot = [0.0] * len(vocab)
+            value = vehicle.get(column)
+            if value is None:
+                correction -= CATEGORY_WEIGHT ** 2 / 2
+            elif category_key(value) in vocab:
+                onehot[vocab[category_key(value)]] = weight
+            else:
+                correction += CATEGORY_WEIGHT ** 2 / 2
+            point.extend(onehot)
+        return np.array(point, dtype=np.float64), correction
+
+    def query(self, vehicle, scales, k, exclude_id=None):
+        """
+        返回最近的 k 辆车
+        返回:
+            [(id, 距离, 价格)]，按距离从近到远排列
+        """
+        if not self.size:
+            return []
+        point, correction = self.vector(vehicle, scales)
+        count = min(k + (1 if exclude_id is not None else 0), self.size)
+        distances, positions = self.tree.query(point.reshape(1, -1), k=count)
+        results = []
+        for distance, position in zip(distances[0], positions[0]):
+            car_id = int(self.ids[position])
+            if car_id == exclude_id:
+                continue
+            price = self.prices[position]
+            results.append((
+                car_id,
+                math.sqrt(max(distance ** 2 + correction, 0.0)),
+                None if np.isnan(price) else int(price)
+            ))
+        return results[:k]
+
+
+class CompsIndex:
+    """
+    某一数据版本的全部分区，创建后不再修改
+    参数:
+        rows: 车辆字典列表，包含 COMPS_COLUMNS 中的全部字段
+        scales: 数值特征的缩放参数，为None时按 rows 计算
+    """
+
+    def __init__(self, rows, scales=None, partitions=None):
+        started = time.perf_counter()
+        self.scales = scales or fit_scales(rows)
+        self.partitions = dict(partitions or {})
+        groups = {}
+        for row in rows:
+            if row['Make'] is None or row['Model'] is None:
+                continue
+            groups.setdefault(partition_key(row['Make'], row['Model']), []).append(row)
+        for key, group in groups.items():
+            self.partitions[key] = Partition.from_rows(group, self.scales, self.partitions.get(key))
+        self.size = sum(partition.size for partition in self.partitions.values())
+        self.max_id = max((int(partition.ids.max()) for partition in self.partitions.values()
+                           if partition.size), default=0)
+        self.build_seconds = time.perf_counter() - started
+
+    def add(self, rows):
+        """返回追加新行后的索引，只重建受影响的分区"""
+        return CompsIndex(rows, self.scales, self.partitions)
+
+    def partition(self, make, model):
+        return self.partitions.get(partition_key(make, model))
+
+    def query(self, vehicle, k, exclude_id=None):
+        """
+        在车辆所属的 (Make, Model) 分区内查找最近的 k 辆车
+        参数:
+            vehicle: 包含 Make、Model 及 NUMERIC_FEATURES、CATEGORICAL_FEATURES 字段的字典，缺少的字段按未指定处理
+            exclude_id: 排除的车辆id（按已有车辆查询时排除其本身）
+        返回:
+            (分区, [(id, 距离, 价格)])，没有对应分区时分区为None
+        """
+        partition = self.partition(vehicle.get('Make'), vehicle.get('Model'))
+        if partition is None:
+            return None, []
+        return partition, partition.query(vehicle, self.scales, k, exclude_id)
+
+
+class ComparableSearch:
+    """
+    可比车辆检索，持有当前数据版本的 CompsIndex
+    参数:
+        connect: 返回数据库连接的函数
+        data_version: DataVersion 实例
+    """
+
+    def __init__(self, connect, data_version):
+        self.connect = connect
+        self.data_version = data_version
+        self.tracker = AppendTracker(connect, COMPS_COLUMNS[1:])
+        self._index = None
+        self._version = None
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+        self.incremental_updates = 0
+
+    def _update(self, version):
+        rows, appended, state = self.tracker.fetch(dictionary=True)
+        if appended and not rows:
+            index = self._index
+        elif appended:
+            index = self._index.add(rows)
+            self.incremental_updates += 1
+        else:
+            index = CompsIndex(rows)
+            self.rebuilds += 1
+        self.tracker.commit(state)
+        return index
+
+    def index(self):
+        """返回当前数据版本的索引，必要时增量更新或重建"""
+        version = self.data_version.get()
+        if self._index is None or version != self._version:
+            with self._lock:
+                if self._index is None or version != self._version:
+                    self._index = self._update(version)
+                    self._version = version
+        return self._index
+
+    def query(self, vehicle, k, exclude_id=None):
+        return self.index().query(vehicle, k, exclude_id)
+
+    def stats(self):
+        index = self._index
+        return {
+            'rows': index.size if index else 0,
+            'partitions': len(index.partitions) if index else 0,
+            'build_seconds': index.build_seconds if index else None,
+            'rebuilds': self.rebuilds,
+            'incremental_updates': self.incremental_updates
+        }
@@ -23,6 +23,74 @@ class Config:
     # 分页默认值
     DEFAULT_PAGE_SIZE = 10
     MAX_PAGE_SIZE = 100
+    
+    # car_info 数据版本探测间隔（秒），内存字典、索引和缓存据此刷新
+    DATA_VERSION_CHECK_INTERVAL = float(os.getenv('DATA_VERSION_CHECK_INTERVAL', 10))
+    
+    # 车辆列表总数缓存：按筛选条件缓存 COUNT(*) 结果，car_info 变化时清空
+    CAR_COUNT_CACHE_SIZE = int(os.getenv('CAR_COUNT_CACHE_SIZE', 1000))
+    CAR_COUNT_CACHE_TTL = int(os.getenv('CAR_COUNT_CACHE_TTL', 300))
+    # 车辆分面统计：数值字段的分桶宽度及按筛选条件缓存的条数
+    CAR_FACET_YEAR_BUCKET = int(os.getenv('CAR_FACET_YEAR_BUCKET', 1))
+    CAR_FACET_PRICE_BUCKET = int(os.getenv('CAR_FACET_PRICE_BUCKET', 100000))
+    CAR_FACET_MILEAGE_BUCKET = int(os.getenv('CAR_FACET_MILEAGE_BUCKET', 50000))
+    CAR_FACET_CACHE_SIZE = int(os.getenv('CAR_FACET_CACHE_SIZE', 500))
+    # 车辆详情行缓存：详情和批量查询共用，按id缓存整行，car_info 变化时清空
+    CAR_ROW_CACHE_SIZE = int(os.getenv('CAR_ROW_CACHE_SIZE', 5000))
+    CAR_ROW_CACHE_TTL = int(os.getenv('CAR_ROW_CACHE_TTL', 300))
+    CAR_MULTI_GET_MAX_IDS = int(os.getenv('CAR_MULTI_GET_MAX_IDS', 100))
+    # 可比车辆检索: 默认和最大返回数量
+    COMPS_DEFAULT_K = int(os.getenv('COMPS_DEFAULT_K', 10))
+    COMPS_MAX_K = int(os.getenv('COMPS_MAX_K', 50))
+    # 品牌、型号模糊匹配: 三元组相似度阈值（0~1）及输入提示的默认返回数量
+    FUZZY_MATCH_THRESHOLD = float(os.getenv('FUZZY_MATCH_THRESHOLD', 0.3))
+    FUZZY_SUGGEST_LIMIT = int(os.getenv('FUZZY_SUGGEST_LIMIT', 10))
+    # 全文检索在 SQL 引擎中转换为 id IN (...) 的最大id数，超过时写入连接的临时表后用子查询筛选
+    TEXT_SEARCH_MAX_IN_IDS = int(os.getenv('TEXT_SEARCH_MAX_IN_IDS', 1000))
+    # 同型号查询的包含匹配: 品牌、型号的最短输入长度（更短时跳过包含匹配）及最多合并的型号数
+    SIMILAR_MODELS_FUZZY_MIN_LENGTH = int(os.getenv('SIMILAR_MODELS_FUZZY_MIN_LENGTH', 2))
+    SIMILAR_MODELS_MAX_FUZZY = int(os.getenv('SIMILAR_MODELS_MAX_FUZZY', 20))
+    # 车辆列表的查询引擎: sql（每次查询数据库）或 memory（内存列式引擎，数据变化后自动重建）
+    CAR_SEARCH_ENGINE = os.getenv('CAR_SEARCH_ENGINE', 'sql')
+    
+    # 预测模型配置
+    MODEL_PATH = os.getenv('MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'random_forest_model.joblib'))
+    MODEL_CHECK_INTERVAL = float(os.getenv('MODEL_CHECK_INTERVAL', 5))
+    # train_model.py 输出带版本号模型文件的目录
+    MODEL_DIR = os.getenv('MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+    # compact_model.py 生成的压缩变体名，设置后预测接口改用 MODEL_DIR/variants/<变体名>.forest
+    MODEL_VARIANT = os.getenv('MODEL_VARIANT', '')
+    SERVING_MODEL_PATH = os.path.join(MODEL_DIR, 'variants', f'{MODEL_VARIANT}.forest') if MODEL_VARIANT else MODEL_PATH
+    # 推理引擎: sklearn（原始模型）或 compiled（数组化森林，单行延迟更低）
+    PREDICT_ENGINE = os.getenv('PREDICT_ENGINE', 'sklearn')
+    PREDICT_BATCH_MAX_SIZE = int(os.getenv('PREDICT_BATCH_MAX_SIZE', 1000))
+    
+    # 预测区间：取各棵树预测值的分位数，MAX_TREES 为0时使用全部树
+    PREDICT_INTERVAL_ENABLED = os.getenv('PREDICT_INTERVAL_ENABLED', 'True').lower() in ('true', '1', 't')
+    PREDICT_INTERVAL_COVERAGE = float(os.getenv('PREDICT_INTERVAL_COVERAGE', 0.9))
+    PREDICT_INTERVAL_MAX_TREES = int(os.getenv('PREDICT_INTERVAL_MAX_TREES', 0))
+    
+    # 逐条预测的特征贡献（按决策路径计算），关闭后返回全局特征重要性
+    PREDICT_EXPLAIN_ENABLED = os.getenv('PREDICT_EXPLAIN_ENABLED', 'True').lower() in ('true', '1', 't')
+    
+    # 微批处理：合并并发的单条预测请求
+    PREDICT_MICROBATCH_ENABLED = os.getenv('PREDICT_MICROBATCH_ENABLED', 'False').lower() in ('true', '1', 't')
+    PREDICT_MICROBATCH_WINDOW_MS = float(os.getenv('PREDICT_MICROBATCH_WINDOW_MS', 5))
+    PREDICT_MICROBATCH_MAX_SIZE = int(os.getenv('PREDICT_MICROBATCH_MAX_SIZE', 64))
+    
+    # 预测结果缓存（LRU + 过期时间，单位秒）
+    PREDICT_CACHE_ENABLED = os.getenv('PREDICT_CACHE_ENABLED', 'True').lower() in ('true', '1', 't')
+    PREDICT_CACHE_MAX_SIZE = int(os.getenv('PREDICT_CACHE_MAX_SIZE', 10000))
+    PREDICT_CACHE_TTL = int(os.getenv('PREDICT_CACHE_TTL', 600))
+    
+    # 折旧曲线：单次请求的最大网格点数及曲线缓存条数
+    PREDICT_CURVE_MAX_POINTS = int(os.getenv('PREDICT_CURVE_MAX_POINTS', 2000))
+    PREDICT_CURVE_CACHE_SIZE = int(os.getenv('PREDICT_CURVE_CACHE_SIZE', 1000))
+    
+    # 多进程推理：行数达到 MIN_ROWS 的批量预测切分给工作进程并行执行，WORKERS 为0时使用全部CPU核心
+    PREDICT_POOL_ENABLED = os.getenv('PREDICT_POOL_ENABLED', 'False').lower() in ('true', '1', 't')
+    PREDICT_POOL_WORKERS = int(os.getenv('PREDICT_POOL_WORKERS', 0))
+    PREDICT_POOL_MIN_ROWS = int(os.getenv('PREDICT_POOL_MIN_ROWS', 500))
 
 # 开发环境配置
 class DevelopmentConfig(Config):
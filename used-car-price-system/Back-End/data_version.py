@@ -0,0 +1,142 @@
+"""
+车辆数据版本模块
+
+用一次轻量查询得到 car_info 的版本标识（行数、最大ID、最近更新时间），
+各类内存索引和缓存据此判断数据是否变化；探测结果在检查间隔内复用，避免每个请求都查询数据库
+"""
+import threading
+import time
+
+
+class DataVersion:
+    """
+    car_info 数据版本探测器
+    参数:
+        connect: 返回数据库连接的函数
+        check_interval: 两次探测之间的最短间隔（秒）
+    """
+
+    def __init__(self, connect, check_interval=10.0):
+        self.connect = connect
+        self.check_interval = check_interval
+        self._version = None
+        self._checked_at = 0.0
+        self._local_changes = 0
+        self._lock = threading.Lock()
+
+    def _probe(self):
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            try:
+                # MySQL 8 默认缓存 information_schema 统计信息，这里要求读取实时值
+                cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+            except Exception:
+                pass
+            cursor.execute("""
+                SELECT UPDATE_TIME FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'car_info'
+            """)
+            row = cursor.fetchone()
+            update_time = str(row[0]) if row and row[0] is not None else None
+
+            cursor.execute("SELECT COUNT(*), MAX(id) FROM car_info")
+            count, max_id = cursor.fetchone()
+            return (int(count), int(max_id or 0), update_time)
+        finally:
+            cursor.close()
+            conn.close()
+
+    def get(self, force=False):
+        """返回当前数据版本，检查间隔内直接返回上次的结果"""
+        now = time.time()
+        if not force and self._version is not None and now - self._checked_at < self.check_interval:
+            return self._version
+        with self._lock:
+            if force or self._version is None or time.time() - self._checked_at >= self.check_interval:
+                self._version = self._probe() + (self._local_changes,)
+                self._checked_at = time.time()
+            return self._version
+
+    def bump(self):
+        """
+        立即产生新版本，由 POST /api/v1/cars/refresh 调用
+        其他进程（如手工执行的 UPDATE）修改了 car_info 但没有改变行数和最大ID、UPDATE_TIME 又不可用时
+        （InnoDB 重启后为 NULL），探测结果不会变化；递增本地计数后各索引按新版本重新核对数据，缓存随之清空
+        """
+        with self._lock:
+            self._local_changes += 1
+            self._checked_at = 0.0
+
+
+def range_checksum(cursor, columns, low, high):
+    """
+    id 在 (low, high] 范围内的行数，以及各行 id 和指定列的 CRC32 异或值
+    列值用 QUOTE 包裹，NULL 与字符串 'NULL' 的校验值不同
+    """
+    values = ", ".join(f"QUOTE(`{column}`)" for column in columns)
+    cursor.execute(
+        f"SELECT COUNT(*), BIT_XOR(CRC32(CONCAT_WS('|', id, {values}))) FROM car_info WHERE id > %s AND id <= %s",
+        (low, high)
+    )
+    count, checksum = cursor.fetchone()
+    return int(count), int(checksum or 0)
+
+
+class AppendTracker:
+    """
+    判断 car_info 的指定列自上次读取后是否只有追加
+    参数:
+        connect: 返回数据库连接的函数
+        columns: 读取的列（不含 id），只有这些列的修改才需要重新读取全部行
+    说明:
+        记录已读取的最大 id，以及 id 不超过它的行数和校验和（各行 CRC32 的异或）。下次读取时在同一事务中
+        重新计算这段范围的行数和校验和：一致说明已读取的行既没有被修改也没有被删除，只需读取 id 更大的新行；
+        不一致时重新读取全部行。数据版本变化的原因（新增、修改、删除可能同时发生）不再需要从行数推断
+    """
+
+    def __init__(self, connect, columns):
+        self.connect = connect
+        self.columns = list(columns)
+        self._state = None
+
+    def fetch(self, dictionary=False):
+        """
+        读取新增的行或全部行
+        返回:
+            (rows, appended, state)：appended 为True时 rows 只包含新增的行；
+            调用方用 rows 更新完索引后再调用 commit(state)，更新失败时下次仍从原来的位置读取
+        """
+        conn = self.connect()
+        cursor = conn.cursor(dictionary=dictionary)
+        plain = conn.cursor() if dictionary else cursor
+        try:
+            state = self._state
+            appended = False
+            if state is not None:
+                appended = range_checksum(plain, self.columns, 0, state[0]) == state[1:]
+            max_id, count, checksum = state if appended else (0, 0, 0)
+
+            cursor.execute(
+                f"SELECT id, {', '.join(self.columns)} FROM car_info WHERE id > %s ORDER BY id", (max_id,)
+            )
+            rows = cursor.fetchall()
+            if rows:
+                last_id = rows[-1]['id'] if dictionary else rows[-1][0]
+                added_count, added_checksum = range_checksum(plain, self.columns, max_id, last_id)
+                max_id, count, checksum = last_id, count + added_count, checksum ^ added_checksum
+            return rows, appended, (max_id, count, checksum)
+        finally:
+            if plain is not cursor:
+                plain.close()
+            cursor.close()
+            conn.close()
+
+    def commit(self, state):
+        self._state = state
+
+    @property
+    def rows(self):
+        """已读取的行数"""
+        return self._state[1] if self._state else 0
+
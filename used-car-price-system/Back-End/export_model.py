@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+模型导出脚本
+
+把 joblib 格式的随机森林导出为可内存映射的目录（每个数组一个 .npy 文件加 manifest.json），
+多个工作进程以只读方式映射同一份文件，由操作系统页缓存共享一份物理内存。
+将 MODEL_PATH 指向导出目录即可使用新格式
+
+用法:
+    python export_model.py [--model random_forest_model.joblib] [--output random_forest_model.forest] [--report]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from joblib import load
+from config import app_config
+from forest_engine import CompiledForest
+from model_manager import FEATURE_ORDER
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 在全新子进程中加载模型并预测一次，测量启动耗时与常驻内存
+MEASURE_SCRIPT = '''
+import json, sys, time
+sys.path.insert(0, {backend_dir!r})
+started = time.perf_counter()
+from model_manager import load_model
+model = load_model({path!r})
+model.predict([[0] * {n_features}])
+elapsed = time.perf_counter() - started
+memory = {{}}
+with open('/proc/self/status') as f:
+    for line in f:
+        key, _, value = line.partition(':')
+        if key in ('VmRSS', 'RssAnon', 'RssFile'):
+            memory[key] = int(value.split()[0]) / 1024
+print(json.dumps({{'load_seconds': elapsed, 'memory_mb': memory}}))
+'''
+
+
+def default_output_path(model_path):
+    return os.path.splitext(model_path)[0] + '.forest'
+
+
+def export(model_path, output_path):
+    """导出模型并返回 manifest"""
+    model = load(model_path)
+    forest = CompiledForest.from_sklearn(model)
+    return forest.save(output_path, FEATURE_ORDER, extra={
+        'source': os.path.basename(model_path)
+    })
+
+
+def measure(path):
+    """在独立进程中测量加载指定格式模型的耗时和内存"""
+    script = MEASURE_SCRIPT.format(backend_dir=BACKEND_DIR, path=path, n_features=len(FEATURE_ORDER))
+    output = subprocess.check_output([sys.executable, '-c', script])
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def print_report(model_path, output_path):
+    print("\n格式对比（每个工作进程）:")
+    print(f"{'格式':<10}{'加载耗时(s)':>14}{'RSS(MB)':>12}{'私有(MB)':>12}{'文件映射(MB)':>16}")
+    for name, path in (('joblib', model_path), ('mmap', output_path)):
+        result = measure(path)
+        memory = result['memory_mb']
+        print(f"{name:<10}{result['load_seconds']:>14.3f}{memory.get('VmRSS', 0):>12.1f}"
+              f"{memory.get('RssAnon', 0):>12.1f}{memory.get('RssFile', 0):>16.1f}")
+    print("说明: mmap 格式的文件映射部分由所有工作进程共享同一份页缓存，只有私有部分随进程数线性增长")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='导出可内存映射的随机森林模型')
+    parser.add_argument('--model', default=app_config.MODEL_PATH, help='joblib 模型文件路径')
+    parser.add_argument('--output', help='导出目录，默认与模型文件同名的 .forest 目录')
+    parser.add_argument('--report', action='store_true', help='对比两种格式的加载耗时和内存占用')
+    args = parser.parse_args()
+
+    output = args.output or default_output_path(args.model)
+    print(f"导出模型: {args.model} -> {output}")
+    manifest = export(args.model, output)
+    print(f"导出完成: {manifest['n_trees']} 棵树，{manifest['n_nodes']} 个节点")
+
+    if args.report:
+        print_report(args.model, output)
@@ -0,0 +1,135 @@
+"""
+分类特征编码模块
+
+从 car_info 一次性构建 名称 -> 编码值 的内存字典，预测接口可以直接接收
+Make、Model、Body_Type 等原始名称，由服务端以O(1)查表完成编码；数据变化后自动重建
+"""
+import threading
+
+# 原始分类字段与对应的编码字段（Model 需要结合 Make 单独处理）
+CATEGORICAL_FIELDS = {
+    'Make': 'Make_encoded',
+    'Body_Type': 'Body_Type_encoded',
+    'Transmission': 'Transmission_encoded',
+    'Fuel_Type': 'Fuel_Type_encoded',
+    'Color': 'Color_encoded',
+    'Location': 'Location_encoded'
+}
+
+
+def normalize(value):
+    """统一大小写和首尾空白，用于原始值无法精确匹配时的回退查找"""
+    return str(value).strip().lower()
+
+
+def _normalize_key(key):
+    if isinstance(key, tuple):
+        return tuple(normalize(part) for part in key)
+    return normalize(key)
+
+
+class CodeMap:
+    """
+    单个字段的 名称 -> 编码值 字典
+    数据中存在仅首尾空白不同却编码不同的取值（如 ' Dubai' 与 'Dubai'），
+    因此先按原始值精确查找，找不到时再按归一化后的名称查找
+    """
+
+    def __init__(self):
+        self.exact = {}
+        self.normalized = {}
+
+    def add(self, key, code):
+        self.exact.setdefault(key, code)
+        self.normalized.setdefault(_normalize_key(key), code)
+
+    def get(self, key):
+        code = self.exact.get(key)
+        if code is None:
+            code = self.normalized.get(_normalize_key(key))
+        return code
+
+
+class FeatureEncoder:
+    """
+    分类特征编码器
+    参数:
+        connect: 返回数据库连接的函数
+        data_version: DataVersion 实例，版本变化时重建字典
+    """
+
+    def __init__(self, connect, data_version):
+        self.connect = connect
+        self.data_version = data_version
+        self._maps = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _build(self):
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            maps = {}
+            for field, encoded_field in CATEGORICAL_FIELDS.items():
+                cursor.execute(f"SELECT DISTINCT {field}, {encoded_field} FROM car_info WHERE {field} IS NOT NULL")
+                maps[field] = CodeMap()
+                for name, code in cursor.fetchall():
+                    if code is not None:
+                        maps[field].add(name, int(code))
+
+            # 车型编码同时按 (品牌, 车型) 和车型名建立索引，优先使用品牌限定的结果
+            cursor.execute("SELECT DISTINCT Make, Model, Model_encoded FROM car_info WHERE Model IS NOT NULL")
+            maps['Model'] = CodeMap()
+            maps['Make_Model'] = CodeMap()
+            for make, model, code in cursor.fetchall():
+                if code is not None:
+                    maps['Make_Model'].add((make, model), int(code))
+                    maps['Model'].add(model, int(code))
+            return maps
+        finally:
+            cursor.close()
+            conn.close()
+
+    def maps(self):
+        """返回当前的编码字典，数据版本变化时重建"""
+        version = self.data_version.get()
+        if self._maps is None or version != self._version:
+            with self._lock:
+                if self._maps is None or version != self._version:
+                    self._maps = self._build()
+                    self._version = version
+        return self._maps
+
+    def encode(self, data):
+        """
+        把请求中的原始分类名称就地转换为对应的 *_encoded 字段
+        已经提供编码值的字段保持不变；遇到未知取值时抛出ValueError
+        """
+        if not isinstance(data, dict):
+            return data
+        fields = [field for field in list(CATEGORICAL_FIELDS) + ['Model']
+                  if data.get(field) not in (None, '') and f'{field}_encoded' not in data]
+        if not fields:
+            return data
+
+        maps = self.maps()
+        unknown = []
+        for field in fields:
+            name = str(data[field])
+            if field == 'Model':
+                code = None
+                if data.get('Make') not in (None, ''):
+                    code = maps['Make_Model'].get((str(data['Make']), name))
+                if code is None:
+                    code = maps['Model'].get(name)
+            else:
+                code = maps[field].get(name)
+
+            if code is None:
+                unknown.append(f'{field}={data[field]}')
+            else:
+                data[f'{field}_encoded'] = code
+
+        if unknown:
+            raise ValueError(f'未知的取值: {", ".join(unknown)}')
+        return data
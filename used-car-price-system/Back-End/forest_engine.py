@@ -0,0 +1,341 @@
+"""
+随机森林数组化推理模块
+
+把 RandomForestRegressor 中的所有决策树展开成连续的 NumPy 数组
+（特征、阈值、左右子节点、节点值），对所有树和所有行同时做向量化遍历，
+省去 sklearn 单行预测时的输入校验、逐棵树调度和线程开销
+"""
+import json
+import os
+import shutil
+import numpy as np
+
+# 导出目录中的数组文件，每个数组单独存为 .npy 以便内存映射
+ARRAY_NAMES = ['feature', 'threshold', 'children_left', 'children_right', 'value', 'roots']
+# 可选数组：节点值量化后的码本，此时 value 中存放的是码本下标；
+# 各节点分裂带来的加权不纯度下降，截断或剪枝后据此重新计算特征重要性
+OPTIONAL_ARRAY_NAMES = ['value_codebook', 'node_gain']
+MANIFEST_NAME = 'manifest.json'
+ARTIFACT_FORMAT_VERSION = 1
+
+
+class CompiledForest:
+    """
+    展开后的随机森林
+    所有树的节点首尾相接存放，roots[i] 是第 i 棵树根节点在数组中的下标；
+    叶子节点的左右子节点都指向自身，遍历到叶子后下标不再变化；
+    value_codebook 不为空时，value 中存放的是码本下标而不是节点值本身
+    """
+
+    def __init__(self, feature, threshold, children_left, children_right, value, roots,
+                 max_depth, n_features, feature_importances=None, value_codebook=None, node_gain=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.feature_importances_ = feature_importances
+        self.value_codebook = value_codebook
+        self.node_gain = node_gain
+        self.manifest = None
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """
+        从训练好的 RandomForestRegressor（单输出）构建
+        预测结果只保证与单线程（n_jobs=None 或 1）的 sklearn 逐位一致；多线程时 sklearn 按线程完成顺序累加，
+        两者可能有末位的浮点误差
+        """
+        features, thresholds, lefts, rights, values, roots, gains = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes, dtype=np.int64)
+            is_leaf = tree.children_left == -1
+
+            # 叶子节点指向自身，非叶子节点的子节点下标加上整体偏移
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int64))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(left)
+            rights.append(right)
+            values.append(tree.value[:, 0, 0].astype(np.float64))
+            roots.append(offset)
+
+            # 与 sklearn 计算特征重要性的方式相同：父节点的加权不纯度减去两个子节点的，再除以根节点的样本权重
+            weighted = tree.weighted_n_node_samples * tree.impurity
+            child_left = np.where(is_leaf, 0, tree.children_left)
+            child_right = np.where(is_leaf, 0, tree.children_right)
+            gain = weighted - weighted[child_left] - weighted[child_right]
+            gains.append(np.where(is_leaf, 0.0, gain) / tree.weighted_n_node_samples[0])
+
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            children_left=np.concatenate(lefts),
+            children_right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=np.array(roots, dtype=np.int64),
+            max_depth=max_depth,
+            n_features=model.n_features_in_ if hasattr(model, 'n_features_in_') else model.n_features_,
+            feature_importances=np.asarray(model.feature_importances_, dtype=np.float64),
+            node_gain=np.concatenate(gains)
+        )
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """
+        从导出目录加载
+        参数:
+            mmap: 为True时以只读方式内存映射数组文件，多个进程共享同一份页缓存
+        """
+        with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(f"不支持的模型文件格式版本: {manifest.get('format_version')}")
+
+        mmap_mode = 'r' if mmap else None
+        arrays = {
+            name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+            for name in ARRAY_NAMES
+        }
+        for name in OPTIONAL_ARRAY_NAMES:
+            path = os.path.join(directory, f'{name}.npy')
+            if os.path.exists(path):
+                arrays[name] = np.load(path, mmap_mode=mmap_mode)
+        forest = cls(
+            max_depth=manifest['max_depth'],
+            n_features=len(manifest['feature_order']),
+            feature_importances=np.array(manifest['feature_importances'], dtype=np.float64)
+            if manifest.get('feature_importances') is not None else None,
+            **arrays
+        )
+        forest.manifest = manifest
+        return forest
+
+    def save(self, directory, feature_order, extra=None):
+        """
+        导出为可内存映射的目录：每个数组一个 .npy 文件，外加记录特征顺序的 manifest.json
+        先写入临时目录再整体替换，正在映射旧文件的进程不受影响
+        """
+        tmp_directory = directory.rstrip(os.sep) + '.tmp'
+        old_directory = directory.rstrip(os.sep) + '.old'
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        os.makedirs(tmp_directory)
+
+        for name in ARRAY_NAMES + OPTIONAL_ARRAY_NAMES:
+            array = getattr(self, name)
+            if array is not None:
+                np.save(os.path.join(tmp_directory, f'{name}.npy'), np.ascontiguousarray(array))
+
+        manifest = {
+            'format_version': ARTIFACT_FORMAT_VERSION,
+            'feature_order': list(feature_order),
+            'n_trees': self.n_trees,
+            'n_nodes': int(len(self.value)),
+            'max_depth': self.max_depth,
+            'feature_importances': [float(x) for x in self.feature_importances_]
+            if self.feature_importances_ is not None else None
+        }
+        if extra:
+            manifest.update(extra)
+        # manifest 最后写入，存在即表示数组文件已完整
+        with open(os.path.join(tmp_directory, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        shutil.rmtree(old_directory, ignore_errors=True)
+        if os.path.exists(directory):
+            os.rename(directory, old_directory)
+        os.rename(tmp_directory, directory)
+        shutil.rmtree(old_directory, ignore_errors=True)
+        return manifest
+
+    def node_values(self, nodes):
+        """取节点值，量化后的森林通过码本还原"""
+        values = self.value[nodes]
+        if self.value_codebook is not None:
+            return self.value_codebook[values]
+        return values
+
+    def _reachable(self, children_left, children_right, roots):
+        """从根节点出发逐层遍历，返回可达节点的掩码和森林的最大深度"""
+        reachable = np.zeros(len(children_left), dtype=bool)
+        frontier = np.asarray(roots)
+        depth = -1
+        while frontier.size:
+            reachable[frontier] = True
+            depth += 1
+            children = np.concatenate([children_left[frontier], children_right[frontier]])
+            frontier = np.unique(children[~reachable[children]])
+        return reachable, depth
+
+    def _importances(self, feature, children_left, node_gain, roots):
+        """
+        按保留下来的分裂节点重新计算特征重要性：每棵树按特征累加不纯度下降并归一化，
+        再对所有有分裂的树求平均，与 sklearn 的 feature_importances_ 一致
+        """
+        is_split = children_left != np.arange(len(children_left))
+        tree_of_node = np.searchsorted(roots, np.arange(len(children_left)), side='right') - 1
+        per_tree = np.zeros((len(roots), self.n_features))
+        np.add.at(per_tree, (tree_of_node[is_split], feature[is_split]), node_gain[is_split])
+        totals = per_tree.sum(axis=1)
+        per_tree = per_tree[totals > 0] / totals[totals > 0, None]
+        if not len(per_tree):
+            return np.zeros(self.n_features)
+        importances = per_tree.mean(axis=0)
+        return importances / importances.sum()
+
+    def _rebuild(self, children_left, children_right, roots, value=None, value_codebook=None):
+        """
+        去掉不可达的节点并重新编号，返回紧凑的新森林
+        参数:
+            value, value_codebook: 替换后的节点值（与原节点一一对应）及码本，默认沿用当前森林的
+        说明:
+            有 node_gain 时按保留的树和分裂节点重新计算特征重要性；没有时（旧版导出文件）无法重新计算，
+            特征重要性置为None，预测接口改用按决策路径计算的影响因素
+        """
+        if value is None:
+            value, value_codebook = self.value, self.value_codebook
+        reachable, max_depth = self._reachable(children_left, children_right, roots)
+        new_index = np.cumsum(reachable) - 1
+        # 下标数组保持 intp，避免遍历时每次花式索引都要转换类型
+        index_dtype = np.intp
+        feature = np.asarray(self.feature)[reachable].astype(index_dtype)
+        new_left = new_index[np.asarray(children_left)[reachable]].astype(index_dtype)
+        new_roots = new_index[np.asarray(roots)].astype(index_dtype)
+        node_gain = np.asarray(self.node_gain)[reachable] if self.node_gain is not None else None
+        return CompiledForest(
+            feature=feature,
+            threshold=np.asarray(self.threshold)[reachable],
+            children_left=new_left,
+            children_right=new_index[np.asarray(children_right)[reachable]].astype(index_dtype),
+            value=np.asarray(value)[reachable],
+            roots=new_roots,
+            max_depth=max_depth,
+            n_features=self.n_features,
+            feature_importances=self._importances(feature, new_left, node_gain, new_roots)
+            if node_gain is not None else None,
+            value_codebook=value_codebook,
+            node_gain=node_gain
+        )
+
+    def truncate(self, n_trees):
+        """只保留前 n_trees 棵树"""
+        return self._rebuild(self.children_left, self.children_right, self.roots[:n_trees])
+
+    def prune(self, max_depth):
+        """把深度达到 max_depth 的节点变为叶子，叶子值取该节点的样本均值"""
+        children_left = np.array(self.children_left)
+        children_right = np.array(self.children_right)
+        frontier = np.asarray(self.roots)
+        for _ in range(max_depth):
+            children = np.concatenate([children_left[frontier], children_right[frontier]])
+            # 叶子节点的子节点是自身，不再向下扩展
+            frontier = np.unique(children[children != np.concatenate([frontier, frontier])])
+        children_left[frontier] = frontier
+        children_right[frontier] = frontier
+        return self._rebuild(children_left, children_right, self.roots)
+
+    def quantize(self, levels=256):
+        """
+        把节点值合并为最多 levels 个取值（按分位数构建码本，每个值映射到最近的码本项），
+        节点值改为存放 uint8/uint16 码本下标
+        """
+        values = self.node_values(np.arange(len(self.value)))
+        codebook = np.unique(np.quantile(values, np.linspace(0, 1, levels)))
+        # 映射到最近的码本项
+        upper = np.clip(np.searchsorted(codebook, values), 1, len(codebook) - 1)
+        lower = upper - 1
+        codes = np.where(values - codebook[lower] <= codebook[upper] - values, lower, upper)
+        code_dtype = np.uint8 if len(codebook) <= 256 else np.uint16
+        return self._rebuild(self.children_left, self.children_right, self.roots,
+                             value=codes.astype(code_dtype), value_codebook=codebook)
+
+    def _prepare(self, features):
+        features = np.asarray(features)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        if features.shape[1] != self.n_features:
+            raise ValueError(f'特征数量应为 {self.n_features}，实际为 {features.shape[1]}')
+        # sklearn 在比较前把输入转换为 float32，这里保持一致以保证结果相同
+        return features.astype(np.float32).astype(np.float64)
+
+    def apply(self, features, tree_indices=None):
+        """
+        返回每棵树对每一行落入的叶子节点下标，形状为 (n_trees, n_rows)
+        参数:
+            tree_indices: 只遍历指定下标的树，默认遍历全部
+        """
+        features = self._prepare(features)
+        n_rows = features.shape[0]
+        roots = self.roots if tree_indices is None else self.roots[tree_indices]
+        nodes = np.repeat(roots[:, None], n_rows, axis=1)
+        rows = np.arange(n_rows)[None, :]
+        for _ in range(self.max_depth):
+            go_left = features[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+        return nodes
+
+    def contributions(self, features, with_leaves=False):
+        """
+        按决策路径计算每个特征对预测值的贡献：沿路径每经过一次分裂，
+        子节点与父节点的均值之差记到该分裂特征上，再对所有树求平均
+        参数:
+            with_leaves: 同时返回每棵树落入的叶子节点（与 apply 相同），供同一次遍历中计算价格和区间
+        返回:
+            (bias, contributions)，bias 形状为 (n_rows,)，是所有树根节点均值的平均；
+            contributions 形状为 (n_rows, n_features)，bias 加上每行贡献之和等于预测值；
+            with_leaves 为True时再加上形状为 (n_trees, n_rows) 的叶子节点下标
+        """
+        features = self._prepare(features)
+        n_rows = features.shape[0]
+        nodes = np.repeat(self.roots[:, None], n_rows, axis=1)
+        rows = np.arange(n_rows)[None, :]
+        # 展平后的 (行, 特征) 下标，用 bincount 一次累加所有树的贡献
+        row_offsets = np.broadcast_to(rows * self.n_features, nodes.shape)
+        totals = np.zeros(n_rows * self.n_features, dtype=np.float64)
+        for _ in range(self.max_depth):
+            split_feature = self.feature[nodes]
+            go_left = features[rows, split_feature] <= self.threshold[nodes]
+            children = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+            # 叶子节点的子节点是自身，差值为0，不影响结果
+            delta = self.node_values(children) - self.node_values(nodes)
+            totals += np.bincount((row_offsets + split_feature).ravel(), weights=delta.ravel(),
+                                  minlength=totals.size)
+            nodes = children
+
+        bias = np.full(n_rows, self.node_values(self.roots).mean())
+        contributions = totals.reshape(n_rows, self.n_features) / self.n_trees
+        if with_leaves:
+            return bias, contributions, nodes
+        return bias, contributions
+
+    def predict_per_tree(self, features, tree_indices=None):
+        """返回每棵树的预测值，形状为 (n_trees, n_rows)"""
+        return self.node_values(self.apply(features, tree_indices))
+
+    @staticmethod
+    def average(per_tree):
+        """按树的顺序逐棵累加后求平均，与 sklearn 的累加顺序一致"""
+        total = np.zeros(per_tree.shape[1], dtype=np.float64)
+        for tree_predictions in per_tree:
+            total += tree_predictions
+        return total / per_tree.shape[0]
+
+    def predict(self, features):
+        """返回森林的预测值，与 sklearn 完全一致"""
+        return self.average(self.predict_per_tree(features))
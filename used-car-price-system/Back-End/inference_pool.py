@@ -0,0 +1,168 @@
+"""
+多进程推理模块
+
+大批量预测在 Flask 请求线程中执行时会与进程内其他请求争抢GIL，
+这里把特征矩阵按行切分后交给一组工作进程并行预测，再按原顺序拼接结果；
+每个工作进程只加载一次模型（导出的内存映射目录可在进程间共享物理内存），
+行数较少的请求仍在当前线程内直接预测，避免进程间传输的开销
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from model_manager import ModelHolder
+
+# 工作进程内的模型，按 (路径, 引擎) 缓存，进程存活期间复用
+_worker_holders = {}
+
+# 工作进程的启动方式：不使用 fork，避免把 Flask 进程中其他线程（如微批调度线程）持有的锁复制到子进程；
+# forkserver 只在服务进程中导入一次主模块，不支持时（如 Windows）使用 spawn
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+class ModelVersionMismatch(Exception):
+    """工作进程能加载到的模型版本与主进程使用的版本不一致"""
+
+
+def _worker_snapshot(path, engine, version=None):
+    """
+    在工作进程中获取模型版本，与主进程的版本不一致时重新加载
+    重新加载后仍不一致（模型文件在主进程加载之后又被替换）时抛出 ModelVersionMismatch，
+    不能用其他版本的模型预测，否则结果会以主进程的版本写入缓存
+    """
+    key = (path, engine)
+    holder = _worker_holders.get(key)
+    if holder is None:
+        # 只按主进程传入的版本重新加载，不定期检查文件
+        holder = ModelHolder(path, check_interval=float('inf'), engine=engine)
+        holder.load()
+        _worker_holders[key] = holder
+    snapshot = holder.get()
+    if version is not None and snapshot.version != version:
+        snapshot = holder.load(force=False)
+        if snapshot.version != version:
+            raise ModelVersionMismatch(f'工作进程的模型版本 {snapshot.version} 与主进程的版本 {version} 不一致')
+    return snapshot
+
+
+def _warm_up(path, engine):
+    _worker_snapshot(path, engine)
+    return os.getpid()
+
+
+def _estimate_chunk(path, engine, version, features, coverage, max_trees):
+    return _worker_snapshot(path, engine, version).estimate(features, coverage, max_trees)
+
+
+class InferencePool:
+    """
+    多进程推理池
+    参数:
+        workers: 工作进程数，0表示使用全部CPU核心
+        min_rows: 行数达到该值才交给工作进程，否则在当前线程内预测
+        min_chunk_rows: 每个工作进程至少分到的行数，避免把中等批次切得过碎
+    """
+
+    def __init__(self, workers=0, min_rows=500, min_chunk_rows=250):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_rows = min_rows
+        self.min_chunk_rows = max(1, min_chunk_rows)
+        self._executor = None
+        self._warm_target = None
+        self._lock = threading.Lock()
+        self._inline_batches = 0
+        self._pool_batches = 0
+        self._pool_rows = 0
+        self._restarts = 0
+        atexit.register(self.shutdown)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(START_METHOD)
+                )
+                self._warm_target = None
+            return self._executor
+
+    def _warm_up_workers(self, executor, snapshot):
+        """新建进程池或模型路径变化后，先让各工作进程预加载模型"""
+        target = (snapshot.path, snapshot.engine)
+        with self._lock:
+            if executor is not self._executor or self._warm_target == target:
+                return
+            self._warm_target = target
+        for _ in range(self.workers):
+            executor.submit(_warm_up, *target)
+
+    def _restart(self, broken):
+        """工作进程异常退出后整个进程池不可再用，替换为新的进程池"""
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+                self._restarts += 1
+        broken.shutdown(wait=False)
+
+    def _dispatch(self, snapshot, features, coverage, max_trees):
+        executor = self._get_executor()
+        n_chunks = min(self.workers, max(1, len(features) // self.min_chunk_rows))
+        try:
+            self._warm_up_workers(executor, snapshot)
+            futures = [
+                executor.submit(_estimate_chunk, snapshot.path, snapshot.engine, snapshot.version,
+                                chunk, coverage, max_trees)
+                for chunk in np.array_split(features, n_chunks)
+            ]
+            estimates = []
+            for future in futures:
+                estimates.extend(future.result())
+            return estimates
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise
+
+    def estimate(self, snapshot, features, coverage=None, max_trees=0):
+        """
+        预测价格及预测区间，参数与 ModelSnapshot.estimate 相同
+        返回:
+            与features行顺序一致的 (price, low, high) 元组列表
+        """
+        if len(features) < self.min_rows or self.workers < 2:
+            self._inline_batches += 1
+            return snapshot.estimate(features, coverage, max_trees)
+
+        try:
+            try:
+                estimates = self._dispatch(snapshot, features, coverage, max_trees)
+            except BrokenProcessPool:
+                # 重启进程池后重试一次
+                estimates = self._dispatch(snapshot, features, coverage, max_trees)
+        except (BrokenProcessPool, ModelVersionMismatch) as e:
+            # 进程池重启后仍不可用，或工作进程加载不到同一版本的模型时，退回当前线程内预测
+            print(f"推理进程池无法完成本批预测，在当前进程内预测: {str(e)}")
+            self._inline_batches += 1
+            return snapshot.estimate(features, coverage, max_trees)
+        self._pool_batches += 1
+        self._pool_rows += len(features)
+        return estimates
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def stats(self):
+        """返回进程池规模、分派与内联执行的批次数及重启次数"""
+        return {
+            'workers': self.workers,
+            'min_rows': self.min_rows,
+            'running': self._executor is not None,
+            'pool_batches': self._pool_batches,
+            'pool_rows': self._pool_rows,
+            'inline_batches': self._inline_batches,
+            'restarts': self._restarts
+        }
@@ -0,0 +1,91 @@
+"""
+带过期时间的LRU缓存模块
+
+容量满时淘汰最久未使用的条目，条目超过TTL后视为失效；
+缓存可以绑定一个版本号（模型版本、数据版本等），版本变化时自动清空
+"""
+import threading
+import time
+from collections import OrderedDict
+
+# 未命中时返回的哨兵值，区分缓存了None的情况
+MISSING = object()
+
+
+class LRUCache:
+    """
+    线程安全的LRU+TTL缓存
+    参数:
+        maxsize: 最大条目数
+        ttl: 条目有效期（秒），为0或None时不过期
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.flushes = 0
+
+    def bind_version(self, version):
+        """绑定版本号，与当前版本不同时清空缓存"""
+        with self._lock:
+            if version != self._version:
+                if self._data:
+                    self.flushes += 1
+                self._data.clear()
+                self._version = version
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = (value, expires_at)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'flushes': self.flushes
+            }
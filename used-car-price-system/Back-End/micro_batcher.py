@@ -0,0 +1,130 @@
+"""
+预测请求微批处理模块
+
+把并发到达的单条预测请求在很短的时间窗口内合并成一批，
+对堆叠后的特征矩阵只调用一次模型，再把结果分发给各自的调用方。
+每条请求携带调用方使用的模型快照，只有同一快照的请求才会合并，模型热切换期间结果与调用方的版本一致
+"""
+import threading
+import time
+from model_manager import build_feature_matrix
+
+
+class _PendingPrediction:
+    """队列中等待预测的一行特征"""
+    __slots__ = ('row', 'snapshot', 'enqueued_at', 'event', 'result', 'error')
+
+    def __init__(self, row, snapshot):
+        self.row = row
+        self.snapshot = snapshot
+        self.enqueued_at = time.perf_counter()
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    微批调度器
+    参数:
+        predict_fn: 接收 (模型快照, (n, 10) 特征矩阵) 并按行顺序返回 n 个预测结果的函数
+        window_ms: 第一条请求入队后最多等待的毫秒数
+        max_batch: 单批最大行数，达到后立即执行
+    """
+
+    def __init__(self, predict_fn, window_ms=5, max_batch=64):
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = []
+        self._cond = threading.Condition()
+        self._worker = None
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._batches = 0
+        self._requests = 0
+        self._max_batch_size = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+            self._worker.start()
+
+    def submit(self, row, snapshot):
+        """提交一行特征及调用方使用的模型快照，阻塞等待它所在批次的预测结果"""
+        item = _PendingPrediction(row, snapshot)
+        with self._cond:
+            self._ensure_worker()
+            self._queue.append(item)
+            # 只在队列由空变为非空或凑满一批时唤醒工作线程
+            if len(self._queue) == 1 or len(self._queue) >= self.max_batch:
+                self._cond.notify()
+        item.event.wait()
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                deadline = self._queue[0].enqueued_at + self.window
+                while len(self._queue) < self.max_batch:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                # 只取与队首同一模型快照的请求，其余留给下一批
+                snapshot = self._queue[0].snapshot
+                batch = []
+                remaining = []
+                for item in self._queue:
+                    if item.snapshot is snapshot and len(batch) < self.max_batch:
+                        batch.append(item)
+                    else:
+                        remaining.append(item)
+                self._queue[:] = remaining
+            self._process(snapshot, batch)
+
+    def _process(self, snapshot, batch):
+        started = time.perf_counter()
+        try:
+            predictions = self.predict_fn(snapshot, build_feature_matrix([item.row for item in batch]))
+            for item, prediction in zip(batch, predictions):
+                item.result = prediction
+        except Exception as e:
+            for item in batch:
+                item.error = e
+        finally:
+            for item in batch:
+                item.event.set()
+
+        waits = [started - item.enqueued_at for item in batch]
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._max_batch_size = max(self._max_batch_size, len(batch))
+            self._total_wait += sum(waits)
+            self._max_wait = max(self._max_wait, max(waits))
+
+    def stats(self):
+        """返回批大小与排队等待时间的统计"""
+        with self._stats_lock:
+            batches = self._batches
+            requests = self._requests
+            return {
+                'batches': batches,
+                'requests': requests,
+                'avg_batch_size': requests / batches if batches else 0,
+                'max_batch_size': self._max_batch_size,
+                'avg_queue_wait_ms': self._total_wait / requests * 1000 if requests else 0,
+                'max_queue_wait_ms': self._max_wait * 1000,
+                'queue_length': len(self._queue),
+                'window_ms': self.window * 1000,
+                'max_batch': self.max_batch
+            }
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+数据库结构迁移脚本
+
+把 car_info 中用于筛选的 TEXT 列改为定长上限的 VARCHAR，并为常用筛选条件建立索引
+（Make/Model 组合索引，Year、Price、Mileage、Body_Type、Fuel_Type、Date 单列索引），
+配合 /api/v1/cars 的 match=exact|prefix 筛选和 sort 排序走索引而不是全表扫描和 filesort。
+每次运行先读取 information_schema 中的实际结构，只执行尚未完成的变更，可以安全地重复运行
+
+用法:
+    python migrate_schema.py [--dry-run]
+"""
+
+import argparse
+import mysql.connector
+from config import app_config
+
+# 数据库配置
+db_config = {
+    'host': app_config.DB_HOST,
+    'user': app_config.DB_USER,
+    'password': app_config.DB_PASSWORD,
+    'database': app_config.DB_NAME
+}
+
+TABLE = 'car_info'
+
+# 需要从 TEXT 改为 VARCHAR 的列及长度上限
+VARCHAR_COLUMNS = [
+    ('Make', 64),
+    ('Model', 128),
+    ('Transmission', 64),
+    ('Color', 32),
+    ('Location', 64),
+    ('Date', 32)
+]
+
+# 需要建立的索引: (索引名, 列)
+INDEXES = [
+    ('idx_make_model', ['Make', 'Model']),
+    ('idx_year', ['Year']),
+    ('idx_price', ['Price']),
+    ('idx_mileage', ['Mileage']),
+    ('idx_body_type', ['Body_Type']),
+    ('idx_fuel_type', ['Fuel_Type']),
+    ('idx_date', ['Date'])
+]
+
+
+def get_db_connection():
+    """获取数据库连接"""
+    return mysql.connector.connect(**db_config)
+
+
+def get_columns(cursor):
+    """返回 {列名: (数据类型, 最大长度)}"""
+    cursor.execute("""
+        SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (TABLE,))
+    return {name: (data_type.lower(), length) for name, data_type, length in cursor.fetchall()}
+
+
+def get_indexes(cursor):
+    """返回 {索引名: [按顺序排列的列名]}"""
+    cursor.execute("""
+        SELECT INDEX_NAME, COLUMN_NAME
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        ORDER BY INDEX_NAME, SEQ_IN_INDEX
+    """, (TABLE,))
+    indexes = {}
+    for index_name, column in cursor.fetchall():
+        indexes.setdefault(index_name, []).append(column)
+    return indexes
+
+
+def plan_migration(cursor):
+    """
+    对比实际结构与目标结构
+    返回:
+        需要执行的 ALTER TABLE 子句列表；已有数据超出目标长度时抛出ValueError
+    """
+    columns = get_columns(cursor)
+    indexes = get_indexes(cursor)
+    clauses = []
+
+    for column, length in VARCHAR_COLUMNS:
+        if column not in columns:
+            raise ValueError(f'{TABLE} 中不存在列 {column}')
+        data_type, current_length = columns[column]
+        if data_type == 'varchar' and current_length is not None and current_length <= length:
+            continue
+
+        # 收窄前确认已有数据都能放下，避免截断
+        cursor.execute(f"SELECT MAX(CHAR_LENGTH(`{column}`)) FROM `{TABLE}`")
+        max_length = cursor.fetchone()[0] or 0
+        if max_length > length:
+            raise ValueError(f'列 {column} 中最长的值有 {max_length} 个字符，超过目标长度 {length}')
+        clauses.append(
+            f"MODIFY COLUMN `{column}` varchar({length}) "
+            f"CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL DEFAULT NULL"
+        )
+
+    existing = {tuple(cols) for cols in indexes.values()}
+    for index_name, cols in INDEXES:
+        if indexes.get(index_name) == cols:
+            continue
+        if index_name in indexes:
+            # 同名索引的列不一致时按目标定义重建
+            clauses.append(f"DROP INDEX `{index_name}`")
+        elif tuple(cols) in existing:
+            # 已有其他名字的相同索引
+            continue
+        clauses.append(f"ADD INDEX `{index_name}` ({', '.join(f'`{col}`' for col in cols)}) USING BTREE")
+
+    return clauses
+
+
+def migrate(dry_run=False):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        clauses = plan_migration(cursor)
+        if not clauses:
+            print(f"{TABLE} 的结构已是最新，无需迁移")
+            return
+
+        # 所有变更合并为一条语句，表只重建一次
+        statement = f"ALTER TABLE `{TABLE}`\n    " + ",\n    ".join(clauses)
+        print(statement)
+        if dry_run:
+            print("--dry-run: 未执行")
+            return
+
+        cursor.execute(statement)
+        conn.commit()
+        print(f"迁移完成，共执行 {len(clauses)} 项变更")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='把 car_info 的筛选列改为 VARCHAR 并建立索引')
+    parser.add_argument('--dry-run', action='store_true', help='只打印将要执行的语句')
+    args = parser.parse_args()
+    try:
+        migrate(args.dry_run)
+    except ValueError as e:
+        raise SystemExit(f"迁移中止: {str(e)}")
@@ -0,0 +1,290 @@
+"""
+价格预测模型管理模块
+
+进程启动时加载一次模型并常驻内存，定期检查模型文件的修改时间，
+文件变化后由后台线程加载新版本并原子切换，加载期间及正在处理的请求继续使用旧版本
+"""
+import os
+import threading
+import time
+from joblib import load
+import numpy as np
+from forest_engine import CompiledForest, MANIFEST_NAME
+
+# 模型输入特征顺序，必须与训练时一致
+FEATURE_ORDER = [
+    'Make_encoded', 'Year', 'Mileage', 'Cylinders', 'Body_Type_encoded',
+    'Transmission_encoded', 'Fuel_Type_encoded', 'Color_encoded',
+    'Location_encoded', 'Model_encoded'
+]
+
+# 与特征顺序一一对应的展示名称
+FEATURE_NAMES = ['Make', 'Year', 'Mileage', 'Cylinders', 'Body Type',
+                 'Transmission', 'Fuel Type', 'Color', 'Location', 'Model']
+
+
+def parse_vehicle(data):
+    """
+    校验单辆车的已编码特征并按模型顺序返回特征行
+    参数:
+        data: 请求中的车辆数据字典，会就地补全默认值并转换为整数
+    返回:
+        按FEATURE_ORDER排列的特征列表，校验失败时抛出ValueError
+    """
+    if not isinstance(data, dict) or not data:
+        raise ValueError('请求中缺少车辆数据')
+
+    required_features = ['Make_encoded', 'Model_encoded', 'Year', 'Mileage',
+                         'Body_Type_encoded', 'Transmission_encoded',
+                         'Fuel_Type_encoded', 'Color_encoded']
+    missing_features = [feature for feature in required_features if feature not in data]
+    if missing_features:
+        raise ValueError(f'缺少必要特征: {", ".join(missing_features)}')
+
+    # 处理可选的Location_encoded和Cylinders字段
+    if 'Location_encoded' not in data:
+        data['Location_encoded'] = 0
+    if 'Cylinders' not in data:
+        data['Cylinders'] = 4
+
+    # 确保所有编码值都是数字类型
+    for key, value in data.items():
+        if key.endswith('_encoded') or key in ['Year', 'Mileage', 'Cylinders']:
+            try:
+                data[key] = int(value)
+            except (ValueError, TypeError):
+                raise ValueError(f'特征 {key} 的值必须是数字')
+
+    return [data[feature] for feature in FEATURE_ORDER]
+
+
+def build_feature_matrix(rows):
+    """按列把多行特征组装成一个 (n, 10) 的模型输入矩阵"""
+    matrix = np.empty((len(rows), len(FEATURE_ORDER)), dtype=np.float64)
+    for column in range(len(FEATURE_ORDER)):
+        matrix[:, column] = [row[column] for row in rows]
+    return matrix
+
+
+def interval_confidence(price, low, high):
+    """根据预测区间相对宽度估算置信度（0-100），区间越窄置信度越高"""
+    if price <= 0:
+        return 0
+    relative_half_width = (high - low) / 2 / price
+    return int(round(max(0.0, min(1.0, 1 - relative_half_width)) * 100))
+
+
+def build_factors(feature_importances):
+    """将特征重要性转换为按影响程度排序的影响因素列表"""
+    factors = []
+    for name, importance in zip(FEATURE_NAMES, feature_importances):
+        # 计算影响百分比
+        impact_percent = importance * 100
+        impact_str = f"+{impact_percent:.1f}%" if importance > 0 else f"-{abs(impact_percent):.1f}%"
+        factors.append((abs(impact_percent), {
+            'name': name,
+            'impact': impact_str
+        }))
+
+    # 按影响程度排序
+    factors.sort(key=lambda x: x[0], reverse=True)
+    return [factor for _, factor in factors]
+
+
+def build_contribution_factors(price, contributions):
+    """
+    将单行的特征贡献转换为按影响程度排序的影响因素列表
+    impact 为该特征把价格从基准值推高或拉低的幅度占预测价格的百分比
+    """
+    factors = []
+    for name, contribution in zip(FEATURE_NAMES, contributions):
+        impact_percent = contribution / abs(price) * 100 if price else 0.0
+        impact_str = f"+{impact_percent:.1f}%" if contribution > 0 else f"-{abs(impact_percent):.1f}%"
+        factors.append((abs(contribution), {
+            'name': name,
+            'impact': impact_str,
+            'contribution': float(contribution)
+        }))
+
+    factors.sort(key=lambda x: x[0], reverse=True)
+    return [factor for _, factor in factors]
+
+
+class ModelSnapshot:
+    """
+    某一版本的已加载模型及其派生数据，创建后不再修改
+    参数:
+        engine: 推理引擎，sklearn 使用原始模型，compiled 使用展开后的数组化森林；
+                从导出目录加载的模型本身就是数组化森林，总是使用 compiled
+    """
+
+    def __init__(self, model, path, version, engine='sklearn'):
+        self.model = model
+        self.path = path
+        self.version = version
+        self.engine = engine
+        self.loaded_at = time.time()
+        if isinstance(model, CompiledForest):
+            self.engine = 'compiled'
+            self.predictor = model
+        elif engine == 'compiled':
+            self.predictor = CompiledForest.from_sklearn(model)
+        elif engine == 'sklearn':
+            self.predictor = model
+        else:
+            raise ValueError(f'不支持的推理引擎: {engine}')
+        # 逐棵树的计算（区间、特征贡献）使用数组化森林，随模型版本一起构建，不在首个请求中临时构建
+        self.forest = self.predictor if isinstance(self.predictor, CompiledForest) else CompiledForest.from_sklearn(model)
+        # 全局影响因素只与模型有关，每个模型版本计算一次；压缩变体无法重新计算特征重要性时为None
+        importances = getattr(model, 'feature_importances_', None)
+        self.factors = build_factors(importances) if importances is not None else None
+
+    def predict(self, features):
+        return self.predictor.predict(features)
+
+    def _tree_indices(self, max_trees):
+        """计算区间使用的树，max_trees 为0或不小于树的数量时返回None（全部）"""
+        if max_trees and max_trees < self.forest.n_trees:
+            # 等间隔抽取固定的一组树，保证同一输入的区间稳定可缓存
+            return np.floor(np.linspace(0, self.forest.n_trees - 1, max_trees)).astype(np.int64)
+        return None
+
+    @staticmethod
+    def _bounds(prices, per_tree, coverage):
+        """由价格和各棵树的预测值生成 (price, low, high) 元组列表，coverage 为None时按±10%估算"""
+        if coverage is None:
+            return [(float(price), float(price) * 0.9, float(price) * 1.1) for price in prices]
+        alpha = (1 - coverage) / 2
+        lows, highs = np.quantile(per_tree, [alpha, 1 - alpha], axis=0)
+        return [
+            (float(price), float(min(low, price)), float(max(high, price)))
+            for price, low, high in zip(prices, lows, highs)
+        ]
+
+    def explain(self, features, coverage=None, max_trees=0):
+        """
+        计算每行预测的特征贡献，同时得到价格及区间
+        特征贡献和每棵树落入的叶子在同一次遍历中得到，价格取各棵树叶子值的平均，不再单独预测
+        参数:
+            coverage、max_trees: 同 estimate
+        返回:
+            (baseline, factors_list, estimates)，baseline 为所有行共同的基准价格，
+            factors_list 为每行按影响程度排序的影响因素列表，estimates 与 estimate 的返回值相同
+        """
+        forest = self.forest
+        bias, contributions, leaves = forest.contributions(features, with_leaves=True)
+        per_tree = forest.node_values(leaves)
+        prices = forest.average(per_tree)
+        tree_indices = self._tree_indices(max_trees)
+        if tree_indices is not None:
+            per_tree = per_tree[tree_indices]
+        factors_list = [
+            build_contribution_factors(price, row)
+            for price, row in zip(prices, contributions)
+        ]
+        baseline = float(bias[0]) if len(bias) else 0.0
+        return baseline, factors_list, self._bounds(prices, per_tree, coverage)
+
+    def estimate(self, features, coverage=None, max_trees=0):
+        """
+        预测价格及预测区间
+        参数:
+            coverage: 区间覆盖率，如0.9表示取各棵树预测值的第5和第95百分位；为None时按±10%估算
+            max_trees: 计算区间时最多使用的树数量，0表示全部，超大森林可据此限制延迟
+        返回:
+            (price, low, high) 元组列表
+        """
+        if coverage is None:
+            return self._bounds(self.predict(features), None, None)
+
+        # 一次遍历得到所有树对所有行的预测，形状为 (n_trees, n_rows)；使用全部树时价格即为其平均，
+        # 与 sklearn 的累加顺序一致，不再单独调用一次模型
+        forest = self.forest
+        tree_indices = self._tree_indices(max_trees)
+        per_tree = forest.predict_per_tree(features, tree_indices)
+        if tree_indices is None:
+            prices = forest.average(per_tree)
+        else:
+            prices = self.predict(features)
+        return self._bounds(prices, per_tree, coverage)
+
+
+def load_model(path):
+    """加载模型：目录视为导出的内存映射模型，其他路径按 joblib 文件加载"""
+    if os.path.isdir(path):
+        return CompiledForest.load(path, mmap=True)
+    return load(path)
+
+
+class ModelHolder:
+    """
+    持有当前模型版本，文件变化时原子切换
+    参数:
+        path: joblib 模型文件，或 export_model.py 导出的内存映射模型目录
+    """
+
+    def __init__(self, path, check_interval=5.0, engine='sklearn'):
+        self.path = path
+        self.check_interval = check_interval
+        self.engine = engine
+        self._snapshot = None
+        self._file_stamp = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        # 同一时间只有一个后台加载线程
+        self._reload_lock = threading.Lock()
+
+    def _stat(self):
+        # 导出目录以最后写入的 manifest 作为版本标识
+        path = self.path
+        if os.path.isdir(path):
+            path = os.path.join(path, MANIFEST_NAME)
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def load(self, force=True):
+        """加载（或重新加载）模型文件，成功后替换当前版本"""
+        with self._lock:
+            stamp = self._stat()
+            # 并发检测到同一次文件变化时只加载一次
+            if not force and self._snapshot is not None and stamp == self._file_stamp:
+                return self._snapshot
+            model = load_model(self.path)
+            version = f"{stamp[0]}-{stamp[1]}"
+            # 先完整构建新版本再替换引用，旧版本由正在使用它的请求继续持有
+            self._snapshot = ModelSnapshot(model, self.path, version, self.engine)
+            self._file_stamp = stamp
+            self._last_check = time.time()
+            return self._snapshot
+
+    def _changed(self):
+        try:
+            return self._stat() != self._file_stamp
+        except OSError:
+            # 文件正在被替换或暂时不可用时继续使用当前版本
+            return False
+
+    def _reload(self):
+        """后台线程：加载变化后的模型文件，失败时继续使用当前版本"""
+        try:
+            self.load(force=False)
+        except Exception as e:
+            print(f"重新加载模型失败，继续使用版本 {self._snapshot.version}: {str(e)}")
+        finally:
+            self._reload_lock.release()
+
+    def get(self):
+        """
+        获取当前模型版本，必要时检查文件是否更新
+        尚未加载过模型时在当前线程加载；文件变化时交给后台线程加载，本次请求立即返回当前版本
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.load(force=False)
+
+        now = time.time()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            if self._changed() and self._reload_lock.acquire(blocking=False):
+                threading.Thread(target=self._reload, name='model-reload', daemon=True).start()
+        return snapshot
@@ -0,0 +1,193 @@
+"""
+同型号价格统计模块
+
+按 (Make, Model, Year) 预先汇总 car_info 的价格：数量、总和、最小值、最大值和排好序的价格数组（用于分位数），
+每个 (Make, Model) 另有跨年份的汇总，查询同型号价格时直接读取，不再逐行拉取和计算。
+品牌、型号按 utf8mb4_general_ci 的规则归并（不区分大小写、忽略尾部空格），与 SQL 的 = 比较一致。
+数据版本变化时由 AppendTracker 核对已统计的行是否未被修改或删除：是则只用新行更新受影响的分组，
+否则整体重建
+"""
+import threading
+import numpy as np
+from car_search_engine import collation_key, like_to_regex
+from data_version import AppendTracker
+
+# 返回的价格分位数
+QUANTILES = (25, 50, 75)
+
+
+class PriceSummary:
+    """一组价格的汇总，创建后不再修改，追加价格时返回新对象"""
+
+    def __init__(self, prices=None):
+        self.prices = np.sort(np.asarray(prices if prices is not None else [], dtype=np.int64))
+        self.count = len(self.prices)
+        self.total = int(self.prices.sum()) if self.count else 0
+
+    def add(self, prices):
+        """返回追加价格后的新汇总"""
+        return PriceSummary(np.concatenate([self.prices, np.asarray(prices, dtype=np.int64)]))
+
+    @staticmethod
+    def merge(summaries):
+        """合并多组价格"""
+        summaries = list(summaries)
+        if len(summaries) == 1:
+            return summaries[0]
+        return PriceSummary(np.concatenate([summary.prices for summary in summaries]) if summaries else None)
+
+    def to_dict(self):
+        if not self.count:
+            return {'avg_price': 0, 'min_price': 0, 'max_price': 0, 'count': 0,
+                    'p25_price': 0, 'median_price': 0, 'p75_price': 0}
+        p25, median, p75 = np.percentile(self.prices, QUANTILES)
+        return {
+            'avg_price': self.total / self.count,
+            'min_price': int(self.prices[0]),
+            'max_price': int(self.prices[-1]),
+            'count': self.count,
+            'p25_price': float(p25),
+            'median_price': float(median),
+            'p75_price': float(p75)
+        }
+
+
+class ModelEntry:
+    """
+    一个 (Make, Model) 的统计
+    属性:
+        make、model: 首次出现的原始写法，用于回查车辆
+        rows: 行数（包括价格为空的行）
+        years: {年份: PriceSummary}
+        summary: 跨年份的 PriceSummary
+    """
+
+    def __init__(self, make, model, rows=0, years=None, summary=None):
+        self.make = make
+        self.model = model
+        self.rows = rows
+        self.years = years or {}
+        self.summary = summary or PriceSummary()
+
+    def add(self, rows):
+        """返回追加 (Year, Price) 行后的新统计"""
+        additions = {}
+        for year, price in rows:
+            if price is not None:
+                additions.setdefault(year, []).append(price)
+        years = dict(self.years)
+        for year, prices in additions.items():
+            years[year] = years[year].add(prices) if year in years else PriceSummary(prices)
+        added = [price for prices in additions.values() for price in prices]
+        summary = self.summary.add(added) if added else self.summary
+        return ModelEntry(self.make, self.model, self.rows + len(rows), years, summary)
+
+
+class ModelPriceStats:
+    """
+    car_info 按 (Make, Model, Year) 汇总的价格统计，随数据版本增量更新
+    参数:
+        connect: 返回数据库连接的函数
+        data_version: DataVersion 实例
+    """
+
+    def __init__(self, connect, data_version):
+        self.connect = connect
+        self.data_version = data_version
+        self.tracker = AppendTracker(connect, ['Make', 'Model', 'Year', 'Price'])
+        self._entries = None
+        self._version = None
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+        self.incremental_updates = 0
+
+    def _apply(self, entries, rows):
+        """把新行按 (Make, Model) 分组后更新对应的统计，未受影响的分组直接沿用"""
+        groups = {}
+        for _, make, model, year, price in rows:
+            if make is None or model is None:
+                continue
+            key = (collation_key(make), collation_key(model))
+            if key not in groups:
+                groups[key] = (make, model, [])
+            groups[key][2].append((year, price))
+
+        entries = dict(entries)
+        for key, (make, model, values) in groups.items():
+            entry = entries.get(key) or ModelEntry(make, model)
+            entries[key] = entry.add(values)
+        return entries
+
+    def _update(self, version):
+        rows, appended, state = self.tracker.fetch()
+        if appended and not rows:
+            entries = self._entries
+        elif appended:
+            entries = self._apply(self._entries, rows)
+            self.incremental_updates += 1
+        else:
+            entries = self._apply({}, rows)
+            self.rebuilds += 1
+        self.tracker.commit(state)
+        return entries
+
+    def entries(self):
+        """返回当前数据版本的 {(品牌键, 型号键): ModelEntry}，必要时增量更新或重建"""
+        version = self.data_version.get()
+        if self._entries is None or version != self._version:
+            with self._lock:
+                if self._entries is None or version != self._version:
+                    self._entries = self._update(version)
+                    self._version = version
+        return self._entries
+
+    def exact(self, make, model):
+        """按 = 比较查找同型号，返回匹配的 ModelEntry 列表"""
+        entry = self.entries().get((collation_key(make), collation_key(model)))
+        return [entry] if entry is not None else []
+
+    def fuzzy(self, make, model, limit=None):
+        """
+        按 LIKE '%品牌%' AND LIKE '%型号%' 查找，只在不同型号的字典上匹配，不扫描车辆行
+        参数:
+            limit: 最多返回的型号数，为None时不限。超过时保留品牌、型号最接近输入（多出的字符最少）的型号，
+                   相同时保留车辆较多的型号
+        """
+        make_regex = like_to_regex(f"%{make}%")
+        model_regex = like_to_regex(f"%{model}%")
+        entries = [
+            entry for entry in self.entries().values()
+            if make_regex.fullmatch(str(entry.make)) and model_regex.fullmatch(str(entry.model))
+        ]
+        if limit is not None and len(entries) > limit:
+            entries.sort(key=lambda entry: (len(str(entry.make)) + len(str(entry.model)), -entry.rows))
+            entries = entries[:limit]
+        return entries
+
+    @staticmethod
+    def summarize(entries):
+        """
+        汇总多个型号的统计
+        返回:
+            (stats, price_by_year, rows)，price_by_year 按年份从新到旧排列
+        """
+        years = {}
+        for entry in entries:
+            for year, summary in entry.years.items():
+                years.setdefault(year, []).append(summary)
+        price_by_year = [
+            dict(PriceSummary.merge(summaries).to_dict(), year=year)
+            for year, summaries in years.items() if year is not None
+        ]
+        price_by_year.sort(key=lambda item: item['year'], reverse=True)
+        stats = PriceSummary.merge(entry.summary for entry in entries).to_dict()
+        return stats, price_by_year, sum(entry.rows for entry in entries)
+
+    def stats(self):
+        entries = self._entries
+        return {
+            'models': len(entries) if entries else 0,
+            'rows': self.tracker.rows,
+            'rebuilds': self.rebuilds,
+            'incremental_updates': self.incremental_updates
+        }
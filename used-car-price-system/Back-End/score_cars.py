@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+离线批量估价脚本
+
+用服务端游标按固定大小分块读取 car_info，直接用已存储的 *_encoded 列组装特征矩阵，
+每块调用一次模型，再用 executemany 批量写入估价结果表，内存占用与表大小无关
+
+用法:
+    python score_cars.py [--chunk-size 5000] [--table car_price_prediction] [--model 模型路径]
+"""
+
+import argparse
+import time
+import mysql.connector
+import numpy as np
+from config import app_config
+from model_manager import ModelHolder, FEATURE_ORDER
+
+# 数据库配置
+db_config = {
+    'host': app_config.DB_HOST,
+    'user': app_config.DB_USER,
+    'password': app_config.DB_PASSWORD,
+    'database': app_config.DB_NAME
+}
+
+
+def get_db_connection():
+    """获取数据库连接"""
+    return mysql.connector.connect(**db_config)
+
+
+def ensure_result_table(conn, table):
+    """创建估价结果表（已存在时跳过）"""
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS `{table}` (
+            `id` int NOT NULL,
+            `Predicted_Price` double NULL DEFAULT NULL,
+            `model_version` varchar(64) NULL DEFAULT NULL,
+            `scored_at` datetime NULL DEFAULT NULL,
+            PRIMARY KEY (`id`) USING BTREE
+        ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_general_ci
+    """)
+    conn.commit()
+    cursor.close()
+
+
+def to_feature_matrix(rows):
+    """
+    把一块数据行转换为特征矩阵
+    返回:
+        (ids, features)，特征缺失或无法转换为数字的行被跳过
+    """
+    ids = []
+    values = []
+    for row in rows:
+        try:
+            values.append([float(value) for value in row[1:]])
+            ids.append(row[0])
+        except (ValueError, TypeError):
+            continue
+    return ids, np.array(values, dtype=np.float64).reshape(len(values), len(FEATURE_ORDER))
+
+
+def score(model_path, table, chunk_size):
+    snapshot = ModelHolder(model_path, engine=app_config.PREDICT_ENGINE).load()
+    print(f"模型: {model_path} (版本 {snapshot.version}, 引擎 {snapshot.engine})")
+
+    # 读和写使用两个连接：读连接上的服务端游标在整个过程中保持打开
+    read_conn = get_db_connection()
+    write_conn = get_db_connection()
+    ensure_result_table(write_conn, table)
+
+    read_cursor = read_conn.cursor(buffered=False)
+    write_cursor = write_conn.cursor()
+    read_cursor.execute(f"SELECT id, {', '.join(FEATURE_ORDER)} FROM car_info ORDER BY id")
+
+    upsert_query = f"""
+        INSERT INTO `{table}` (id, Predicted_Price, model_version, scored_at)
+        VALUES (%s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE
+            Predicted_Price = VALUES(Predicted_Price),
+            model_version = VALUES(model_version),
+            scored_at = VALUES(scored_at)
+    """
+
+    started = time.perf_counter()
+    scored = 0
+    skipped = 0
+    try:
+        while True:
+            rows = read_cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+
+            ids, features = to_feature_matrix(rows)
+            skipped += len(rows) - len(ids)
+            if ids:
+                prices = snapshot.predict(features)
+                write_cursor.executemany(upsert_query, [
+                    (car_id, float(price), snapshot.version) for car_id, price in zip(ids, prices)
+                ])
+                write_conn.commit()
+                scored += len(ids)
+
+            elapsed = time.perf_counter() - started
+            print(f"已估价 {scored} 行，跳过 {skipped} 行，{scored / elapsed:.0f} 行/秒")
+    finally:
+        read_cursor.close()
+        write_cursor.close()
+        read_conn.close()
+        write_conn.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"完成: 共估价 {scored} 行，跳过 {skipped} 行，耗时 {elapsed:.2f} 秒，"
+          f"吞吐 {scored / elapsed if elapsed else 0:.0f} 行/秒，结果写入表 {table}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='对 car_info 全表批量估价')
+    parser.add_argument('--model', default=app_config.SERVING_MODEL_PATH,
+                        help='模型文件或导出目录，默认与服务端相同（SERVING_MODEL_PATH）')
+    parser.add_argument('--table', default='car_price_prediction', help='估价结果表名')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='每块读取和预测的行数')
+    args = parser.parse_args()
+
+    score(args.model, args.table, args.chunk_size)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+数组化随机森林推理测试
+
+校验 CompiledForest 与 sklearn 原始模型的预测完全一致，比较单行预测延迟，
+并校验逐条特征贡献之和等于预测值、测量其相对普通预测的额外开销
+"""
+
+import sys
+import time
+import numpy as np
+from joblib import load
+from config import app_config
+from forest_engine import CompiledForest
+
+
+def random_features(n_rows, seed=0):
+    """在各特征的合理取值范围内生成随机输入"""
+    rng = np.random.RandomState(seed)
+    return np.column_stack([
+        rng.randint(0, 60, n_rows),          # Make_encoded
+        rng.randint(1990, 2025, n_rows),     # Year
+        rng.randint(0, 400000, n_rows),      # Mileage
+        rng.choice([3, 4, 6, 8, 10, 12], n_rows),  # Cylinders
+        rng.randint(0, 10, n_rows),          # Body_Type_encoded
+        rng.randint(0, 2, n_rows),           # Transmission_encoded
+        rng.randint(0, 5, n_rows),           # Fuel_Type_encoded
+        rng.randint(0, 20, n_rows),          # Color_encoded
+        rng.randint(0, 5, n_rows),           # Location_encoded
+        rng.randint(0, 500, n_rows)          # Model_encoded
+    ]).astype(np.float64)
+
+
+def test_parity(model_path=app_config.MODEL_PATH):
+    """测试数组化森林与 sklearn 的预测结果完全一致"""
+    print("测试预测一致性...")
+    model = load(model_path)
+    # 多线程时 sklearn 按线程完成顺序累加各棵树，结果会有末位误差，逐位比较前固定为单线程
+    model.n_jobs = None
+    forest = CompiledForest.from_sklearn(model)
+    print(f"树数量: {forest.n_trees}, 节点总数: {len(forest.value)}, 最大深度: {forest.max_depth}")
+
+    features = random_features(2000)
+    expected = model.predict(features)
+    actual = forest.predict(features)
+    assert np.array_equal(expected, actual), f"最大误差: {np.max(np.abs(expected - actual))}"
+
+    # 单行输入同样一致
+    for row in features[:50]:
+        assert forest.predict(row.reshape(1, -1))[0] == model.predict(row.reshape(1, -1))[0]
+
+    print("✅ 测试通过: 2000 行批量预测与 50 次单行预测结果完全一致")
+    print("-" * 50)
+
+
+def measure_latency(predict, features, repeat):
+    timings = []
+    for i in range(repeat):
+        row = features[i % len(features)].reshape(1, -1)
+        started = time.perf_counter()
+        predict(row)
+        timings.append((time.perf_counter() - started) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def test_latency(model_path=app_config.MODEL_PATH, repeat=300):
+    """比较 sklearn 与数组化森林的单行预测延迟"""
+    print("比较单行预测延迟...")
+    model = load(model_path)
+    forest = CompiledForest.from_sklearn(model)
+    features = random_features(repeat, seed=1)
+
+    sklearn_p50, sklearn_p99 = measure_latency(model.predict, features, repeat)
+    compiled_p50, compiled_p99 = measure_latency(forest.predict, features, repeat)
+
+    print(f"sklearn:  p50={sklearn_p50:.3f}ms  p99={sklearn_p99:.3f}ms")
+    print(f"compiled: p50={compiled_p50:.3f}ms  p99={compiled_p99:.3f}ms")
+    print(f"p50 加速比: {sklearn_p50 / compiled_p50:.1f}x")
+    print("-" * 50)
+
+
+def test_contributions(model_path=app_config.MODEL_PATH, repeat=300):
+    """测试特征贡献的可加性，并比较计算贡献与普通预测的耗时"""
+    print("测试逐条特征贡献...")
+    model = load(model_path)
+    forest = CompiledForest.from_sklearn(model)
+    features = random_features(500, seed=2)
+
+    bias, contributions = forest.contributions(features)
+    assert contributions.shape == (500, forest.n_features)
+    assert np.allclose(bias + contributions.sum(axis=1), forest.predict(features), rtol=1e-9, atol=1e-6)
+    print("✅ 测试通过: 基准值加各特征贡献之和等于预测值")
+
+    predict_p50, _ = measure_latency(forest.predict, features, repeat)
+    explain_p50, explain_p99 = measure_latency(forest.contributions, features, repeat)
+    print(f"单行预测:      p50={predict_p50:.3f}ms")
+    print(f"单行特征贡献:  p50={explain_p50:.3f}ms  p99={explain_p99:.3f}ms  ({explain_p50 / predict_p50:.1f}x)")
+
+    started = time.perf_counter()
+    forest.contributions(features)
+    batch_ms = (time.perf_counter() - started) * 1000
+    print(f"500 行批量特征贡献: {batch_ms:.1f}ms")
+    print("-" * 50)
+
+
+if __name__ == '__main__':
+    print("开始测试数组化随机森林推理...\n")
+    path = sys.argv[1] if len(sys.argv) > 1 else app_config.MODEL_PATH
+    test_parity(path)
+    test_latency(path)
+    test_contributions(path)
+    print("测试完成!")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+车辆筛选索引测试
+
+在运行过 migrate_schema.py 的数据库上，用 EXPLAIN 检查 /api/v1/cars 各类筛选和排序生成的查询是否使用了索引
+"""
+
+import mysql.connector
+from config import app_config
+from car_query import build_car_filters, parse_sort, order_by_sql
+from migrate_schema import plan_migration
+
+# 数据库配置
+db_config = {
+    'host': app_config.DB_HOST,
+    'user': app_config.DB_USER,
+    'password': app_config.DB_PASSWORD,
+    'database': app_config.DB_NAME
+}
+
+# (筛选参数, 预期使用的索引)，预期为None表示该查询无法使用索引（仅打印执行计划）
+CASES = [
+    ({'make': 'bentley', 'match': 'exact'}, 'idx_make_model'),
+    ({'make': 'bentley', 'model': 'bentayga', 'match': 'exact'}, 'idx_make_model'),
+    ({'make': 'mer', 'match': 'prefix'}, 'idx_make_model'),
+    ({'body_type': 'SUV', 'match': 'exact'}, 'idx_body_type'),
+    ({'fuel_type': 'Diesel', 'match': 'exact'}, 'idx_fuel_type'),
+    ({'year_min': '2023'}, 'idx_year'),
+    ({'price_min': '3000000'}, 'idx_price'),
+    ({'mileage_max': '1000'}, 'idx_mileage'),
+    ({'make': 'mer'}, None)
+]
+
+# 排序参数，按索引顺序扫描时执行计划中不应出现 filesort
+SORT_CASES = [
+    {'sort': 'price'},
+    {'sort': 'price', 'order': 'asc'},
+    {'sort': 'mileage'},
+    {'sort': 'year', 'order': 'asc'},
+    {'sort': 'date'}
+]
+
+
+def explain(cursor, args, limit=None):
+    conditions, params = build_car_filters(args)
+    query = "EXPLAIN SELECT id FROM car_info"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    if limit:
+        query += f" {order_by_sql(*parse_sort(args))} LIMIT {int(limit)}"
+    cursor.execute(query, params)
+    return cursor.fetchone()
+
+
+def test_migration_applied(cursor):
+    """测试结构迁移已全部完成（重复运行迁移脚本不会再有变更）"""
+    print("测试结构迁移是否已完成...")
+    clauses = plan_migration(cursor)
+    if not clauses:
+        print("✅ 测试通过: car_info 的结构已是最新")
+    else:
+        print("❌ 测试失败: 仍有未完成的变更，请先运行 python migrate_schema.py")
+        for clause in clauses:
+            print(f"  {clause}")
+    print("-" * 50)
+
+
+def test_filter_indexes(cursor):
+    """测试各类筛选条件的执行计划"""
+    print("测试筛选条件是否使用索引...")
+    passed = 0
+    for args, expected in CASES:
+        plan = explain(cursor, args)
+        summary = f"{args} -> type={plan['type']}, key={plan['key']}, rows={plan['rows']}"
+        if expected is None:
+            print(f"ℹ️  {summary}（包含匹配无法使用索引）")
+            passed += 1
+        elif plan['key'] == expected:
+            print(f"✅ {summary}")
+            passed += 1
+        else:
+            print(f"❌ {summary}，预期使用 {expected}")
+    print(f"通过 {passed}/{len(CASES)}")
+    print("-" * 50)
+
+
+def test_sort_indexes(cursor):
+    """测试排序查询是否按索引顺序扫描"""
+    print("测试排序是否避免 filesort...")
+    passed = 0
+    for args in SORT_CASES:
+        plan = explain(cursor, args, limit=10)
+        summary = f"{args} -> key={plan['key']}, Extra={plan['Extra']}"
+        if 'filesort' not in (plan['Extra'] or ''):
+            print(f"✅ {summary}")
+            passed += 1
+        else:
+            print(f"❌ {summary}")
+    print(f"通过 {passed}/{len(SORT_CASES)}")
+    print("-" * 50)
+
+
+if __name__ == "__main__":
+    print("开始测试车辆筛选索引...\n")
+    conn = mysql.connector.connect(**db_config)
+    try:
+        test_migration_applied(conn.cursor())
+        test_filter_indexes(conn.cursor(dictionary=True))
+        test_sort_indexes(conn.cursor(dictionary=True))
+    finally:
+        conn.close()
+    print("测试完成!")
@@ -0,0 +1,168 @@
+"""
+车辆描述全文检索模块
+
+对 car_info.Description 建立倒排索引：词 -> 按 id 升序排列的倒排表（NumPy 数组）。
+多词查询要求所有词都出现，从最短的倒排表开始逐个求交集；
+新增的行只需把它们的 id 追加到对应倒排表末尾，无需重建整个索引
+"""
+import re
+import threading
+import numpy as np
+from data_version import AppendTracker
+
+TOKEN_PATTERN = re.compile(r'[0-9a-z]+')
+
+
+def tokenize(text):
+    """把文本切分为小写的字母数字词，标点和连字符都作为分隔符"""
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+
+def query_terms(query):
+    """
+    查询中去重并排序后的词，也作为缓存键的一部分
+    查询为空时返回None（不做全文检索）；不为空但不含可检索的词（如只有标点或非拉丁字符）时返回空元组，
+    检索结果为空，而不是忽略该条件
+    """
+    if query is None or not str(query).strip():
+        return None
+    return tuple(sorted(set(tokenize(query))))
+
+
+def intersect_sorted(small, large):
+    """两个升序且无重复的 id 数组求交集，在较长的数组上二分查找较短数组中的每个 id"""
+    if len(small) == 0 or len(large) == 0:
+        return small[:0]
+    index = np.searchsorted(large, small)
+    index[index == len(large)] = 0
+    return small[large[index] == small]
+
+
+class InvertedIndex:
+    """
+    倒排索引，创建后可以追加新行
+    写入时先复制词典再整体替换，查询线程总是看到完整的某一版本
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.size = 0
+        self.max_id = 0
+
+    def copy(self):
+        """浅复制，倒排表数组在追加时总是新建，可以在副本之间共享"""
+        index = InvertedIndex()
+        index.postings = self.postings
+        index.size = self.size
+        index.max_id = self.max_id
+        return index
+
+    def add(self, rows):
+        """
+        追加 (id, 描述) 行
+        id 大于已有最大 id 时直接拼接到倒排表末尾，否则合并后保持升序
+        """
+        additions = {}
+        count = 0
+        max_id = self.max_id
+        for car_id, text in rows:
+            count += 1
+            max_id = max(max_id, car_id)
+            for token in set(tokenize(text)):
+                additions.setdefault(token, []).append(car_id)
+        if not count:
+            return
+
+        postings = dict(self.postings)
+        for token, ids in additions.items():
+            ids = np.array(sorted(ids), dtype=np.int64)
+            existing = postings.get(token)
+            if existing is None:
+                postings[token] = ids
+            elif ids[0] > existing[-1]:
+                postings[token] = np.concatenate([existing, ids])
+            else:
+                postings[token] = np.union1d(existing, ids)
+        self.postings = postings
+        self.size += count
+        self.max_id = max_id
+
+    def search(self, terms):
+        """
+        返回包含所有词的 id（升序数组）
+        参数:
+            terms: query_terms 返回的词元组
+        """
+        postings = self.postings
+        lists = [postings.get(term) for term in terms]
+        if not lists or any(ids is None for ids in lists):
+            return np.empty(0, dtype=np.int64)
+        lists.sort(key=len)
+        result = lists[0]
+        for ids in lists[1:]:
+            result = intersect_sorted(result, ids)
+            if len(result) == 0:
+                break
+        return result
+
+
+class DescriptionIndex:
+    """
+    car_info.Description 的倒排索引，随数据版本增量更新
+    参数:
+        connect: 返回数据库连接的函数
+        data_version: DataVersion 实例
+    说明:
+        数据版本变化时由 AppendTracker 核对已索引的行是否未被修改或删除：是则只把新行追加到索引
+        （Description 以外的列被修改时索引保持不变），否则整体重建
+    """
+
+    def __init__(self, connect, data_version):
+        self.connect = connect
+        self.data_version = data_version
+        self.tracker = AppendTracker(connect, ['Description'])
+        self._index = None
+        self._version = None
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+        self.incremental_updates = 0
+
+    def _update(self, version):
+        rows, appended, state = self.tracker.fetch()
+        if appended and not rows:
+            index = self._index
+        elif appended:
+            index = self._index.copy()
+            index.add(rows)
+            self.incremental_updates += 1
+        else:
+            index = InvertedIndex()
+            index.add(rows)
+            self.rebuilds += 1
+        self.tracker.commit(state)
+        return index
+
+    def index(self):
+        """返回当前数据版本的索引，必要时增量更新或重建"""
+        version = self.data_version.get()
+        if self._index is None or version != self._version:
+            with self._lock:
+                if self._index is None or version != self._version:
+                    self._index = self._update(version)
+                    self._version = version
+        return self._index
+
+    def search(self, terms):
+        """返回描述中包含所有词的车辆 id（升序数组）"""
+        return self.index().search(terms)
+
+    def stats(self):
+        index = self._index
+        return {
+            'rows': index.size if index else 0,
+            'terms': len(index.postings) if index else 0,
+            'rebuilds': self.rebuilds,
+            'incremental_updates': self.incremental_updates
+        }
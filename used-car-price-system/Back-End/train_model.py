@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+模型训练脚本
+
+分块读取 car_info 到紧凑的定长数组中，使用全部CPU核心训练随机森林，
+生成 predict_price 使用的 random_forest_model.joblib。
+支持增量训练：只读取上次训练水位（最大 id）之后的新数据，在原有森林上追加新树，而不是从头重训
+
+每次运行都会在 models 目录写入带版本号的模型文件和训练报告（耗时、峰值内存、留出集误差），
+并以原子替换的方式发布到 MODEL_PATH，运行中的服务会自动切换到新模型
+
+留出集与水位:
+    训练报告记录水位和留出集的全部 id。增量训练时基础模型的留出集原样继承，再加上新数据中划出的留出集，
+    这些行始终不参与任何一棵树的训练，留出集误差在继承后的全部留出行上计算；compact_model.py 也按这些 id 评估。
+    水位和留出集只从基础模型的报告读取，默认即 --model 发布的模型。--no-publish 生成的模型不替换发布的模型和报告，
+    下一次 --incremental 仍从发布模型的水位开始；要在未发布的模型上继续增量训练，用 --base 指定它
+
+用法:
+    python train_model.py [--trees 100] [--chunk-size 5000]
+    python train_model.py --incremental [--add-trees 20] [--base models/random_forest_model-<版本>.joblib]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+import mysql.connector
+import numpy as np
+from joblib import dump, load
+from sklearn.ensemble import RandomForestRegressor
+from config import app_config
+from model_manager import FEATURE_ORDER
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块
+    resource = None
+
+# 数据库配置
+db_config = {
+    'host': app_config.DB_HOST,
+    'user': app_config.DB_USER,
+    'password': app_config.DB_PASSWORD,
+    'database': app_config.DB_NAME
+}
+
+
+def get_db_connection():
+    """获取数据库连接"""
+    return mysql.connector.connect(**db_config)
+
+
+def report_path(model_path):
+    """模型文件对应的训练报告路径，记录训练水位等信息"""
+    return os.path.splitext(model_path)[0] + '.json'
+
+
+def peak_memory_mb():
+    if resource is None:
+        return None
+    # Linux 下 ru_maxrss 单位为KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def read_rows(cursor, chunk_size, capacity=None):
+    """
+    从已执行 SELECT id, 特征..., Price 的游标分块读取到定长数组
+    返回:
+        (ids, features, prices)，特征为 float32 矩阵，价格为 float64 数组；含缺失值的行被跳过
+    """
+    capacity = capacity or chunk_size
+    ids = np.empty(capacity, dtype=np.int64)
+    features = np.empty((capacity, len(FEATURE_ORDER)), dtype=np.float32)
+    prices = np.empty(capacity, dtype=np.float64)
+    size = 0
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        for row in rows:
+            try:
+                values = [float(value) for value in row[1:]]
+            except (ValueError, TypeError):
+                continue
+            # 容量不足时按倍数扩容，避免逐行追加带来的反复拷贝
+            if size == capacity:
+                capacity *= 2
+                ids.resize(capacity, refcheck=False)
+                features.resize((capacity, len(FEATURE_ORDER)), refcheck=False)
+                prices.resize(capacity, refcheck=False)
+            ids[size] = row[0]
+            features[size] = values[:-1]
+            prices[size] = values[-1]
+            size += 1
+    return ids[:size].copy(), features[:size].copy(), prices[:size].copy()
+
+
+def load_training_data(after_id=0, chunk_size=5000):
+    """
+    分块读取 id 大于 after_id 的数据
+    返回:
+        (ids, features, prices)，格式同 read_rows
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(buffered=False)
+    try:
+        cursor.execute(f"""
+            SELECT id, {', '.join(FEATURE_ORDER)}, Price
+            FROM car_info
+            WHERE id > %s
+            ORDER BY id
+        """, (after_id,))
+        return read_rows(cursor, chunk_size)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def load_rows_by_ids(car_ids, chunk_size=5000):
+    """
+    按 id 分批读取指定的行（如训练报告中的留出集），已删除或含缺失值的行被跳过
+    返回:
+        (ids, features, prices)，格式同 read_rows，按 id 升序排列
+    """
+    car_ids = np.unique(np.asarray(car_ids, dtype=np.int64))
+    parts = []
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(car_ids), chunk_size):
+            batch = car_ids[start:start + chunk_size]
+            cursor.execute(f"""
+                SELECT id, {', '.join(FEATURE_ORDER)}, Price
+                FROM car_info
+                WHERE id IN ({', '.join(['%s'] * len(batch))})
+                ORDER BY id
+            """, [int(car_id) for car_id in batch])
+            parts.append(read_rows(cursor, chunk_size, max(1, len(batch))))
+    finally:
+        cursor.close()
+        conn.close()
+    if not parts:
+        return (np.empty(0, dtype=np.int64), np.empty((0, len(FEATURE_ORDER)), dtype=np.float32),
+                np.empty(0, dtype=np.float64))
+    return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+
+def split_holdout(n_rows, holdout_ratio, seed):
+    """随机划分训练集和留出集的下标"""
+    order = np.random.RandomState(seed).permutation(n_rows)
+    n_holdout = int(round(n_rows * holdout_ratio))
+    return order[n_holdout:], order[:n_holdout]
+
+
+def evaluate(model, features, prices):
+    if len(prices) == 0:
+        return None
+    predicted = model.predict(features)
+    errors = predicted - prices
+    total_variance = np.sum((prices - prices.mean()) ** 2)
+    return {
+        'mae': float(np.mean(np.abs(errors))),
+        'rmse': float(np.sqrt(np.mean(errors ** 2))),
+        'r2': float(1 - np.sum(errors ** 2) / total_variance) if total_variance else None,
+        'rows': int(len(prices))
+    }
+
+
+def publish(model_file, model_path, report):
+    """把带版本号的模型文件原子替换到服务使用的路径，并写入对应的训练报告"""
+    tmp_path = model_path + '.tmp'
+    shutil.copyfile(model_file, tmp_path)
+    os.replace(tmp_path, model_path)
+    with open(report_path(model_path), 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def train(args):
+    started = time.perf_counter()
+    previous = None
+    watermark = 0
+    previous_holdout = np.empty(0, dtype=np.int64)
+    base = args.base or args.model
+    if args.incremental:
+        if not os.path.exists(report_path(base)):
+            raise SystemExit(f"找不到上次训练报告 {report_path(base)}，请先完整训练一次")
+        with open(report_path(base), encoding='utf-8') as f:
+            previous = json.load(f)
+        watermark = previous['watermark']
+        if 'holdout_ids' in previous:
+            previous_holdout = np.asarray(previous['holdout_ids'], dtype=np.int64)
+        else:
+            print("基础模型的训练报告没有记录留出集 id，留出集只包含本次的新数据")
+
+    print(f"读取 id > {watermark} 的数据...")
+    ids, features, prices = load_training_data(watermark, args.chunk_size)
+    print(f"读取完成: {len(ids)} 行，特征矩阵 {features.nbytes / 1024 / 1024:.1f}MB")
+    if len(ids) == 0:
+        print("没有新数据，无需训练")
+        return
+
+    train_index, holdout_index = split_holdout(len(ids), args.holdout, args.seed)
+
+    if args.incremental:
+        # 在原有森林上追加新树，新树只使用水位之后的数据训练
+        model = load(base)
+        model.set_params(warm_start=True, n_jobs=-1, n_estimators=len(model.estimators_) + args.add_trees)
+    else:
+        model = RandomForestRegressor(
+            n_estimators=args.trees,
+            max_depth=args.max_depth,
+            min_samples_leaf=args.min_samples_leaf,
+            n_jobs=-1,
+            random_state=args.seed
+        )
+
+    fit_started = time.perf_counter()
+    model.fit(features[train_index], prices[train_index])
+    fit_seconds = time.perf_counter() - fit_started
+    # 发布后的模型用默认的单线程预测，避免单行预测时的线程调度开销
+    model.set_params(n_jobs=None, warm_start=False)
+
+    # 留出集：继承基础模型的留出行（同样从未参与训练），加上本次新数据的留出行
+    holdout_ids = np.concatenate([previous_holdout, ids[holdout_index]])
+    holdout_features = features[holdout_index]
+    holdout_prices = prices[holdout_index]
+    if len(previous_holdout):
+        _, previous_features, previous_prices = load_rows_by_ids(previous_holdout, args.chunk_size)
+        holdout_features = np.vstack([previous_features, holdout_features])
+        holdout_prices = np.concatenate([previous_prices, holdout_prices])
+
+    version = time.strftime('%Y%m%d-%H%M%S')
+    os.makedirs(args.output_dir, exist_ok=True)
+    model_file = os.path.join(args.output_dir, f'random_forest_model-{version}.joblib')
+    dump(model, model_file)
+
+    report = {
+        'version': version,
+        'mode': 'incremental' if args.incremental else 'full',
+        'base_version': previous['version'] if previous else None,
+        'watermark': int(ids.max()),
+        'rows': int(len(ids)),
+        'train_rows': int(len(train_index)),
+        'n_trees': len(model.estimators_),
+        'fit_seconds': fit_seconds,
+        'wall_seconds': time.perf_counter() - started,
+        'peak_memory_mb': peak_memory_mb(),
+        'holdout': evaluate(model, holdout_features, holdout_prices),
+        'holdout_ids': [int(car_id) for car_id in np.sort(holdout_ids)],
+        'artifact': model_file,
+        'artifact_mb': os.path.getsize(model_file) / 1024 / 1024
+    }
+    with open(report_path(model_file), 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if not args.no_publish:
+        publish(model_file, args.model, report)
+        print(f"已发布到 {args.model}")
+
+    print(json.dumps(dict(report, holdout_ids=f'<{len(holdout_ids)} 个id>'), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='训练二手车价格预测随机森林')
+    parser.add_argument('--model', default=app_config.MODEL_PATH, help='服务使用的模型路径')
+    parser.add_argument('--output-dir', default=app_config.MODEL_DIR, help='带版本号的模型文件目录')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='每次从数据库读取的行数')
+    parser.add_argument('--trees', type=int, default=100, help='完整训练时的树数量')
+    parser.add_argument('--max-depth', type=int, default=None, help='树的最大深度')
+    parser.add_argument('--min-samples-leaf', type=int, default=1, help='叶子节点最少样本数')
+    parser.add_argument('--holdout', type=float, default=0.2, help='留出集比例')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--incremental', action='store_true', help='只用水位之后的新数据追加新树')
+    parser.add_argument('--add-trees', type=int, default=20, help='增量训练时追加的树数量')
+    parser.add_argument('--base', help='增量训练的基础模型，默认为 --model 发布的模型；在 --no-publish 生成的模型上继续训练时指定')
+    parser.add_argument('--no-publish', action='store_true',
+                        help='只生成带版本号的模型，不替换服务使用的模型及其报告（发布的水位不变）')
+    train(parser.parse_args())
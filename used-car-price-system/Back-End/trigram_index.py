@@ -0,0 +1,217 @@
+"""
+品牌、型号模糊匹配模块
+
+在 car_info 中不同的 Make、Model 取值上建立三元组（trigram）倒排索引，把用户输入（包括拼写错误，如 mercedez）
+按相似度解析为库中的规范写法。三元组的提取方式与 PostgreSQL pg_trgm 相同：按字母数字切词，
+每个词前补两个空格、后补一个空格后取所有连续三个字符；相似度为两组三元组的交集大小除以并集大小。
+取值只有几百个，查询时对命中的倒排表做一次 bincount 即可得到所有候选的共同三元组数
+"""
+import threading
+import numpy as np
+from car_query import MATCH_MODES, text_condition
+from car_search_engine import collation_key, value_matcher
+from text_index import tokenize
+
+
+def trigrams(text):
+    """返回文本的三元组集合"""
+    grams = set()
+    for word in tokenize(text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """
+    一组取值的三元组倒排索引，创建后不再修改
+    参数:
+        values: 取值列表
+    """
+
+    def __init__(self, values):
+        self.values = list(values)
+        self.sizes = np.zeros(len(self.values), dtype=np.int64)
+        postings = {}
+        for position, value in enumerate(self.values):
+            grams = trigrams(value)
+            self.sizes[position] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(position)
+        self.postings = {gram: np.array(positions, dtype=np.int64) for gram, positions in postings.items()}
+
+    def search(self, query, threshold=0.0, limit=None, allowed=None):
+        """
+        按相似度从高到低返回 [(取值, 相似度)]
+        参数:
+            threshold: 最低相似度
+            limit: 最多返回的数量，为None时不限
+            allowed: 限定的取值比较键集合，为None时不限定
+        """
+        grams = trigrams(query)
+        lists = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not lists:
+            return []
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.values))
+        positions = np.flatnonzero(shared)
+        similarity = shared[positions] / (len(grams) + self.sizes[positions] - shared[positions])
+        results = [
+            (self.values[position], float(score))
+            for position, score in zip(positions, similarity)
+            if score >= threshold and (allowed is None or collation_key(self.values[position]) in allowed)
+        ]
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results[:limit] if limit is not None else results
+
+
+class Vocabulary:
+    """
+    某一数据版本中不同的 (Make, Model) 取值及其三元组索引，创建后不再修改
+    取值按 utf8mb4_general_ci 的规则归并（不区分大小写、忽略尾部空格），保留首次出现的写法
+    参数:
+        pairs: (品牌, 型号) 列表
+    """
+
+    def __init__(self, pairs):
+        makes = {}
+        models = {}
+        self.model_makes = {}
+        for make, model in pairs:
+            make_key = collation_key(make)
+            model_key = collation_key(model)
+            makes.setdefault(make_key, make)
+            models.setdefault(model_key, model)
+            self.model_makes.setdefault(model_key, set()).add(make_key)
+        self.makes = list(makes.values())
+        self.models = list(models.values())
+        self.make_index = TrigramIndex(self.makes)
+        self.model_index = TrigramIndex(self.models)
+
+    def models_for(self, make_matcher=None):
+        """返回品牌满足条件的型号，make_matcher 为None时返回全部型号"""
+        if make_matcher is None:
+            return self.models
+        make_keys = {collation_key(make) for make in self.makes if make_matcher(make)}
+        return [model for model in self.models if self.model_makes[collation_key(model)] & make_keys]
+
+    def models_of(self, make, match='contains'):
+        """返回品牌按 match 方式匹配 make 的型号"""
+        return self.models_for(value_matcher(*text_condition('Make', make, match)[1:]))
+
+    def search(self, field, query, threshold=0.0, limit=None, scope=None):
+        """
+        按三元组相似度查找品牌（field='make'）或型号（field='model'）
+        参数:
+            scope: 限定的候选取值列表，为None时不限定
+        """
+        index = self.make_index if field == 'make' else self.model_index
+        allowed = {collation_key(value) for value in scope} if scope is not None else None
+        return index.search(query, threshold, limit, allowed)
+
+    def suggest(self, field, query, threshold=0.0, limit=10, scope=None):
+        """
+        输入提示：包含输入内容的取值排在前面，其余按三元组相似度补充
+        返回:
+            [(取值, 相似度)]
+        """
+        values = scope if scope is not None else (self.makes if field == 'make' else self.models)
+        needle = str(query).strip().lower()
+        if not needle:
+            return []
+        ranked = dict(self.search(field, query, 0.0, None, values))
+        contains = sorted(
+            (value for value in values if needle in str(value).lower()),
+            key=lambda value: (-ranked.get(value, 0.0), value)
+        )
+        results = [(value, ranked.get(value, 0.0)) for value in contains]
+        seen = set(contains)
+        results.extend(
+            (value, score) for value, score in self.search(field, query, threshold, None, values)
+            if value not in seen
+        )
+        return results[:limit]
+
+    def resolve_filters(self, args, threshold):
+        """
+        品牌、型号筛选按 match 方式在库中找不到任何取值时，替换为三元组相似度最高的规范写法
+        参数:
+            args: 请求参数（request.args 或普通字典）
+        返回:
+            (替换后的参数字典, {字段: 规范写法})，没有替换时第二项为空字典
+        """
+        args = args.to_dict() if hasattr(args, 'to_dict') else dict(args)
+        resolved = {}
+        match = (args.get('match') or 'contains').lower()
+        if match not in MATCH_MODES:
+            return args, resolved
+
+        make_matcher = None
+        if args.get('make'):
+            make_matcher = value_matcher(*text_condition('Make', args['make'], match)[1:])
+            if not any(make_matcher(make) for make in self.makes):
+                candidates = self.search('make', args['make'], threshold, 1)
+                if candidates:
+                    args['make'] = resolved['make'] = candidates[0][0]
+                    make_matcher = value_matcher(*text_condition('Make', args['make'], match)[1:])
+
+        if args.get('model'):
+            scope = self.models_for(make_matcher)
+            model_matcher = value_matcher(*text_condition('Model', args['model'], match)[1:])
+            if not any(model_matcher(model) for model in scope):
+                candidates = self.search('model', args['model'], threshold, 1, scope)
+                if candidates:
+                    args['model'] = resolved['model'] = candidates[0][0]
+        return args, resolved
+
+    def closest_pair(self, make, model, threshold):
+        """
+        按品牌、型号的相似度找出最接近的 (品牌, 型号)
+        品牌先按包含匹配，找不到时取相似度不低于阈值的品牌；型号在这些品牌的型号中按相似度选取
+        返回:
+            (品牌, 型号)，找不到时返回None
+        """
+        needle = str(make).strip().lower()
+        makes = [(value, 1.0) for value in self.makes if needle and needle in str(value).lower()]
+        if not makes:
+            makes = self.search('make', make, threshold)
+        make_scores = {collation_key(value): score for value, score in makes}
+
+        best = None
+        for value, score in self.search('model', model, threshold):
+            for make_key in self.model_makes[collation_key(value)] & set(make_scores):
+                candidate = (score, make_scores[make_key], make_key, value)
+                if best is None or candidate[:2] > best[:2]:
+                    best = candidate
+        if best is None:
+            return None
+        return next(value for value in self.makes if collation_key(value) == best[2]), best[3]
+
+
+class MakeModelVocabulary:
+    """
+    随价格统计更新的品牌、型号字典
+    参数:
+        price_stats: ModelPriceStats 实例，其分组即为库中全部不同的 (Make, Model)
+    """
+
+    def __init__(self, price_stats):
+        self.price_stats = price_stats
+        self._entries = None
+        self._vocabulary = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """返回当前数据版本的 Vocabulary，价格统计更新后重建"""
+        entries = self.price_stats.entries()
+        if entries is not self._entries:
+            with self._lock:
+                if entries is not self._entries:
+                    self._vocabulary = Vocabulary((entry.make, entry.model) for entry in entries.values())
+                    self._entries = entries
+        return self._vocabulary
+
+    def resolve_filters(self, args, threshold):
+        """没有品牌、型号筛选时直接返回，不加载字典"""
+        if not args.get('make') and not args.get('model'):
+            return args, {}
+        return self.get().resolve_filters(args, threshold)
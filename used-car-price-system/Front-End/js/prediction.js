@@ -103,14 +103,14 @@ const prediction = {
         }
     },
     
-    // 获取同型号车辆信息
-    async getSimilarModels(make, model) {
+    // 获取同型号车辆信息，统计覆盖全部同型号车辆，similar_cars 只包含第 page 页
+    async getSimilarModels(make, model, page = 1, pageSize = 10) {
         if (!make || !model) return null;
         
-        console.log(`开始获取同型号车辆信息: 品牌=${make}, 型号=${model}`);
+        console.log(`开始获取同型号车辆信息: 品牌=${make}, 型号=${model}, 页码=${page}`);
         
         try {
-            const url = `${this.baseUrl}/cars/similar-models?make=${encodeURIComponent(make)}&model=${encodeURIComponent(model)}`;
+            const url = `${this.baseUrl}/cars/similar-models?make=${encodeURIComponent(make)}&model=${encodeURIComponent(model)}&page=${page}&limit=${pageSize}`;
             console.log(`请求URL: ${url}`);
             
             const response = await fetch(url);
@@ -125,42 +125,19 @@ const prediction = {
             console.log('获取同型号车辆响应:', result);
             
             if (result.status === 'success') {
-                // 检查是否真的有数据
-                if (result.data.similar_cars && result.data.similar_cars.length > 0) {
-                    console.log(`成功获取到 ${result.data.similar_cars.length} 辆同型号车辆`);
-                    // 打印第一条数据作为示例
-                    console.log('示例数据:', result.data.similar_cars[0]);
-                    
-                    // 初始化分页相关数据
-                    const data = result.data;
-                    const paginatedData = this.paginateSimilarCars(data.similar_cars, 1, 10); // 第1页，每页10条
-                    
-                    return {
-                        ...data,
-                        pagination: {
-                            currentPage: 1,
-                            pageSize: 10,
-                            totalPages: Math.ceil(data.similar_cars.length / 10)
-                        }
-                    };
-                } else {
+                const data = result.data;
+                if (!data.similar_cars || data.similar_cars.length === 0) {
                     console.warn('API返回成功但没有车辆数据');
-                    return {
-                        similar_cars: [],
-                        stats: {
-                            avg_price: 0,
-                            min_price: 0,
-                            max_price: 0,
-                            count: 0
-                        },
-                        price_by_year: [],
-                        pagination: {
-                            currentPage: 1,
-                            pageSize: 10,
-                            totalPages: 0
-                        }
-                    };
                 }
+                
+                return {
+                    ...data,
+                    pagination: {
+                        currentPage: data.page,
+                        pageSize: data.limit,
+                        totalPages: data.total_pages
+                    }
+                };
             } else {
                 console.error('API返回错误:', result.message);
                 throw new Error(result.message || '获取同型号车辆数据失败');
@@ -171,32 +148,25 @@ const prediction = {
         }
     },
     
-    // 分页处理同型号车辆数据
-    paginateSimilarCars(cars, page, pageSize) {
-        const startIndex = (page - 1) * pageSize;
-        const endIndex = startIndex + pageSize;
-        return cars.slice(startIndex, endIndex);
-    },
-    
     // 预测车辆价格
     async predictPrice(carData) {
         try {
-            // 1. 将用户选择的数据转换为编码值
-            const encodedData = {
-                Make_encoded: this.encodingMaps.makes[carData.make],
-                Model_encoded: this.encodingMaps.models[carData.model],
+            // 1. 直接发送用户选择的名称，由服务端完成编码
+            const requestData = {
+                Make: carData.make,
+                Model: carData.model,
                 Year: carData.year,
                 Mileage: carData.mileage,
                 Cylinders: carData.cylinders || 4, // 使用用户选择的气缸数
-                Body_Type_encoded: this.encodingMaps.bodyTypes[carData.body_type],
-                Transmission_encoded: this.encodingMaps.transmissions[carData.transmission],
-                Fuel_Type_encoded: this.encodingMaps.fuelTypes[carData.fuel_type],
-                Color_encoded: this.encodingMaps.colors[carData.color],
+                Body_Type: carData.body_type,
+                Transmission: carData.transmission,
+                Fuel_Type: carData.fuel_type,
+                Color: carData.color,
                 Location_encoded: 0 // 默认值设为0，因为我们移除了location选择
             };
             
-            // 对编码数据进行调试输出，查看是否有undefined或null
-            console.log('发送预测数据:', encodedData);
+            // 对请求数据进行调试输出，查看是否有undefined或null
+            console.log('发送预测数据:', requestData);
             
             // 2. 发送API请求
             const response = await fetch(`${this.baseUrl}/prediction/predict`, {
@@ -204,7 +174,7 @@ const prediction = {
                 headers: {
                     'Content-Type': 'application/json'
                 },
-                body: JSON.stringify(encodedData)
+                body: JSON.stringify(requestData)
             });
             
             if (!response.ok) {